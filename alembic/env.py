@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 from app.database import Base
-from models import Hospital, JobStatus 
+from models import Hospital, JobStatus, BatchRowError, ImportChunk
 
 config = context.config
 
@@ -0,0 +1,68 @@
+"""add hospital dedup_key and job_status duplicate_hospitals
+
+Revision ID: 0c4b7e2a5f18
+Revises: f1c6a8d3e297
+Create Date: 2026-10-17 15:48:30.772405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c4b7e2a5f18'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a8d3e297'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must match app.utils.normalize_text / hospital_dedup_key (see 9c1f4e7a2b86).
+NORMALIZED = "btrim(regexp_replace(lower({column}), '[^[:alnum:]]+', ' ', 'g'))"
+DEDUP_KEY = "md5({name} || '|' || {address})".format(
+    name=NORMALIZED.format(column="name"),
+    address=NORMALIZED.format(column="address"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hospitals', sa.Column('dedup_key', sa.String(length=32), nullable=True))
+    op.add_column('job_status', sa.Column('duplicate_hospitals', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    # Existing duplicates cannot all share a key under the unique index:
+    # only the oldest hospital of each group gets one, the rest keep NULL.
+    op.execute(f"""
+        UPDATE hospitals AS h
+        SET dedup_key = k.dedup_key
+        FROM (
+            SELECT DISTINCT ON (dedup_key) id, dedup_key
+            FROM (SELECT id, {DEDUP_KEY} AS dedup_key FROM hospitals) AS keyed
+            ORDER BY dedup_key, id
+        ) AS k
+        WHERE h.id = k.id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_hospitals_dedup_key',
+            'hospitals',
+            ['dedup_key'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ux_hospitals_dedup_key',
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('job_status', 'duplicate_hospitals')
+    op.drop_column('hospitals', 'dedup_key')
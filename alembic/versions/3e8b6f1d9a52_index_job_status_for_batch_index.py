@@ -0,0 +1,56 @@
+"""index job_status for the batch index
+
+Revision ID: 3e8b6f1d9a52
+Revises: 7d2f9a4c6b35
+Create Date: 2026-10-17 18:12:37.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8b6f1d9a52'
+down_revision: Union[str, Sequence[str], None] = '7d2f9a4c6b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_job_status_status_created_at',
+            'job_status',
+            ['status', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_job_status_created_at_id',
+            'job_status',
+            ['created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_job_status_created_at_id',
+            table_name='job_status',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_job_status_status_created_at',
+            table_name='job_status',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
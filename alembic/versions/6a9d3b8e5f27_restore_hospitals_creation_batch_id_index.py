@@ -0,0 +1,44 @@
+"""restore hospitals creation_batch_id index
+
+Revision ID: 6a9d3b8e5f27
+Revises: 2d7e4f9b1c63
+Create Date: 2026-10-17 12:31:05.774120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a9d3b8e5f27'
+down_revision: Union[str, Sequence[str], None] = '2d7e4f9b1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so restoring the index does not lock the
+    # hospitals table against writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_hospitals_creation_batch_id'),
+            'hospitals',
+            ['creation_batch_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_hospitals_creation_batch_id'),
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
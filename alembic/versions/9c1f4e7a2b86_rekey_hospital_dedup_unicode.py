@@ -0,0 +1,52 @@
+"""recompute hospital dedup_key keeping non-ASCII characters
+
+Revision ID: 9c1f4e7a2b86
+Revises: 3e8b6f1d9a52
+Create Date: 2026-10-18 10:04:51.208637
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1f4e7a2b86'
+down_revision: Union[str, Sequence[str], None] = '3e8b6f1d9a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must match app.utils.normalize_text / hospital_dedup_key. Postgres has
+# no casefold(); lower() differs from it only for a few characters (ß).
+# [[:alnum:]] follows the database's ctype locale, so a4c9e1b7d3f5
+# recomputes these keys in Python.
+NORMALIZED = "btrim(regexp_replace(lower({column}), '[^[:alnum:]]+', ' ', 'g'))"
+DEDUP_KEY = "md5({name} || '|' || {address})".format(
+    name=NORMALIZED.format(column="name"),
+    address=NORMALIZED.format(column="address"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keys written before this revision dropped every non-ASCII character.
+    # As in 0c4b7e2a5f18, only the oldest hospital of a group gets a key.
+    op.execute("UPDATE hospitals SET dedup_key = NULL WHERE dedup_key IS NOT NULL")
+    op.execute(f"""
+        UPDATE hospitals AS h
+        SET dedup_key = k.dedup_key
+        FROM (
+            SELECT DISTINCT ON (dedup_key) id, dedup_key
+            FROM (SELECT id, {DEDUP_KEY} AS dedup_key FROM hospitals) AS keyed
+            ORDER BY dedup_key, id
+        ) AS k
+        WHERE h.id = k.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Keys stay valid (and unique) for the previous revision's lookups.
+    pass
@@ -0,0 +1,87 @@
+"""recompute hospital dedup_key with app.utils.hospital_dedup_key
+
+Revision ID: a4c9e1b7d3f5
+Revises: e6b2d8f3c1a4
+Create Date: 2026-10-18 16:22:09.574310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import hospital_dedup_key
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e1b7d3f5'
+down_revision: Union[str, Sequence[str], None] = 'e6b2d8f3c1a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 5000
+
+
+def rekey(bind) -> None:
+    """
+    Recomputes every hospital's dedup_key in Python. The SQL backfills of
+    0c4b7e2a5f18 and 9c1f4e7a2b86 depend on the database's ctype locale
+    ([[:alnum:]] is ASCII-only under C), so their keys need not match the
+    ones the API computes. As there, only the oldest hospital of a group
+    gets a key.
+    """
+    bind.execute(sa.text(
+        "CREATE TEMPORARY TABLE hospital_dedup_keys "
+        "(id integer PRIMARY KEY, dedup_key varchar(32) NOT NULL)"
+    ))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, name, address FROM hospitals "
+                "WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            sa.text(
+                "INSERT INTO hospital_dedup_keys (id, dedup_key) "
+                "VALUES (:id, :dedup_key)"
+            ),
+            [
+                {"id": row.id, "dedup_key": hospital_dedup_key(row.name, row.address)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    bind.execute(sa.text(
+        "UPDATE hospitals SET dedup_key = NULL WHERE dedup_key IS NOT NULL"
+    ))
+    bind.execute(sa.text("""
+        UPDATE hospitals AS h
+        SET dedup_key = k.dedup_key
+        FROM (
+            SELECT DISTINCT ON (dedup_key) id, dedup_key
+            FROM hospital_dedup_keys
+            ORDER BY dedup_key, id
+        ) AS k
+        WHERE h.id = k.id
+    """))
+    bind.execute(sa.text("DROP TABLE hospital_dedup_keys"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rekey(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Keys stay valid (and unique) for the previous revision's lookups.
+    pass
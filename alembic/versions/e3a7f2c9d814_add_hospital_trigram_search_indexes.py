@@ -0,0 +1,62 @@
+"""add hospital trigram search indexes
+
+Revision ID: e3a7f2c9d814
+Revises: b5e8c1f4a9d2
+Create Date: 2026-10-17 14:20:09.357811
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7f2c9d814'
+down_revision: Union[str, Sequence[str], None] = 'b5e8c1f4a9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_hospitals_name_trgm',
+            'hospitals',
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_hospitals_address_trgm',
+            'hospitals',
+            ['address'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'address': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_hospitals_address_trgm',
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_hospitals_name_trgm',
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,58 @@
+"""index hospitals on (creation_batch_id, id)
+
+Revision ID: f1c6a8d3e297
+Revises: e3a7f2c9d814
+Create Date: 2026-10-17 15:02:44.129587
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8d3e297'
+down_revision: Union[str, Sequence[str], None] = 'e3a7f2c9d814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The composite index also serves plain creation_batch_id lookups,
+    # and lets chunked activation walk a batch in id order.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_hospitals_creation_batch_id_id',
+            'hospitals',
+            ['creation_batch_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            op.f('ix_hospitals_creation_batch_id'),
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_hospitals_creation_batch_id'),
+            'hospitals',
+            ['creation_batch_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_hospitals_creation_batch_id_id',
+            table_name='hospitals',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,197 @@
+from sqlalchemy import delete, false, func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Hospital, JobStatus, BatchRowError, ImportChunk, UploadPart
+from .cache import cache, batch_key, hospital_key
+from .const import BATCH_OP_CHUNK_SIZE
+
+
+async def set_batch_progress(
+    db: AsyncSession,
+    batch_id: str,
+    key: str,
+    progress: dict,
+) -> None:
+    """
+    Merges `{key: progress}` into the job's sys_custom_fields in place,
+    without reading and rewriting the rest of the document.
+    """
+    await db.execute(
+        update(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .values(
+            sys_custom_fields=JobStatus.sys_custom_fields.op("||")(
+                literal({key: progress}, JSONB)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def activate_batch_hospitals(db: AsyncSession, batch_id: str) -> None:
+    """
+    Flips the batch's hospitals to active BATCH_OP_CHUNK_SIZE rows per
+    transaction, walking the (creation_batch_id, id) index in id order and
+    recording progress under sys_custom_fields["activation"].
+    """
+    last_id = 0
+    activated = 0
+
+    while True:
+        chunk_ids = (
+            select(Hospital.id)
+            .where(
+                Hospital.creation_batch_id == batch_id,
+                Hospital.id > last_id,
+            )
+            .order_by(Hospital.id)
+            .limit(BATCH_OP_CHUNK_SIZE)
+        )
+        result = await db.execute(
+            update(Hospital)
+            .where(Hospital.id.in_(chunk_ids))
+            .values(is_active=True)
+            .returning(Hospital.id)
+            .execution_options(synchronize_session=False)
+        )
+        hospital_ids = result.scalars().all()
+
+        if not hospital_ids:
+            break
+
+        last_id = max(hospital_ids)
+        activated += len(hospital_ids)
+
+        await set_batch_progress(db, batch_id, "activation", {
+            "status": "IN_PROGRESS",
+            "activated_hospitals": activated,
+        })
+        await db.commit()
+        await cache.invalidate(
+            [batch_key(batch_id)] + [hospital_key(id_) for id_ in hospital_ids]
+        )
+
+    await set_batch_progress(db, batch_id, "activation", {
+        "status": "COMPLETED",
+        "activated_hospitals": activated,
+    })
+    await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
+
+
+async def fail_batch_activation(
+    db: AsyncSession, batch_id: str, error: str
+) -> None:
+    """
+    Marks an activation that ran out of retries as FAILED, keeping its
+    progress, and clears batch_activated so it can be started again.
+    """
+    activation = func.coalesce(
+        JobStatus.sys_custom_fields.op("->")("activation"), literal({}, JSONB)
+    ).op("||")(literal({"status": "FAILED", "error": error}, JSONB))
+
+    await db.execute(
+        update(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .values(
+            sys_custom_fields=JobStatus.sys_custom_fields.op("||")(
+                func.jsonb_build_object(
+                    "batch_activated", false(), "activation", activation
+                )
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
+
+
+async def fail_batch_deletion(
+    db: AsyncSession, batch_id: str, error: str
+) -> None:
+    """
+    Marks a deletion that ran out of retries as FAILED, keeping its
+    progress. The batch stays DELETING; deleting it again resumes.
+    """
+    deletion = func.coalesce(
+        JobStatus.sys_custom_fields.op("->")("deletion"), literal({}, JSONB)
+    ).op("||")(literal({"status": "FAILED", "error": error}, JSONB))
+
+    await db.execute(
+        update(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .values(
+            sys_custom_fields=JobStatus.sys_custom_fields.op("||")(
+                func.jsonb_build_object("deletion", deletion)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
+
+
+async def delete_batch_rows(db: AsyncSession, batch_id: str) -> None:
+    """
+    Deletes the batch's hospitals and row errors BATCH_OP_CHUNK_SIZE rows
+    per transaction, recording progress under sys_custom_fields["deletion"],
+    and finally removes the job itself.
+    """
+    deleted = 0
+
+    while True:
+        chunk_ids = (
+            select(Hospital.id)
+            .where(Hospital.creation_batch_id == batch_id)
+            .limit(BATCH_OP_CHUNK_SIZE)
+        )
+        result = await db.execute(
+            delete(Hospital)
+            .where(Hospital.id.in_(chunk_ids))
+            .returning(Hospital.id)
+            .execution_options(synchronize_session=False)
+        )
+        hospital_ids = result.scalars().all()
+
+        if not hospital_ids:
+            break
+
+        deleted += len(hospital_ids)
+
+        await set_batch_progress(db, batch_id, "deletion", {
+            "status": "IN_PROGRESS",
+            "deleted_hospitals": deleted,
+        })
+        await db.commit()
+        await cache.invalidate(
+            [batch_key(batch_id)] + [hospital_key(id_) for id_ in hospital_ids]
+        )
+
+    while True:
+        chunk_ids = (
+            select(BatchRowError.id)
+            .where(BatchRowError.batch_id == batch_id)
+            .limit(BATCH_OP_CHUNK_SIZE)
+        )
+        result = await db.execute(
+            delete(BatchRowError)
+            .where(BatchRowError.id.in_(chunk_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        if not result.rowcount:
+            break
+
+    await db.execute(
+        delete(ImportChunk).where(ImportChunk.batch_id == batch_id)
+    )
+    await db.execute(
+        delete(UploadPart).where(UploadPart.batch_id == batch_id)
+    )
+    await db.execute(
+        delete(JobStatus).where(JobStatus.batch_id == batch_id)
+    )
+    await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
@@ -0,0 +1,210 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+import orjson
+from redis import asyncio as aioredis
+
+from .const import (
+    CACHE_REDIS_URL,
+    CACHE_TTL_SECONDS,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_VALUE_BYTES,
+    JOB_BACKEND,
+)
+from .utils import dumps_json
+
+logger = logging.getLogger(__name__)
+
+# Batches in these states only change through activate/delete, which
+# invalidate them explicitly.
+CACHEABLE_BATCH_STATUSES = {"COMPLETED", "COMPLETED_WITH_ERRORS"}
+
+
+def hospital_key(hospital_id: int) -> str:
+    return f"hms:hospital:{hospital_id}"
+
+
+def batch_key(batch_id: str) -> str:
+    return f"hms:batch:{batch_id}"
+
+
+class LRUCache:
+    """
+    In-process cache with per-entry TTL, evicting the least recently used
+    entry once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class Cache:
+    """
+    Read-through JSON cache backed by Redis when CACHE_REDIS_URL is set,
+    with the in-process LRU as fallback when Redis is not configured or
+    not reachable.
+
+    Invalidations made in another process (the Celery worker) never reach
+    this process's LRU, so without `local_fallback` nothing is cached
+    unless Redis is available.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        ttl: int,
+        max_entries: int,
+        max_value_bytes: int,
+        local_fallback: bool = True,
+    ):
+        self.ttl = ttl
+        self.local_fallback = local_fallback
+        self.max_value_bytes = max_value_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = LRUCache(max_entries)
+        self._redis = aioredis.from_url(redis_url) if redis_url else None
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = None
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception as err:
+                logger.warning("Cache read from Redis failed: %s", err)
+                raw = self._local_get(key)
+        else:
+            raw = self._local_get(key)
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return orjson.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        raw = dumps_json(value)
+        if len(raw) > self.max_value_bytes:
+            return
+
+        ttl = ttl or self.ttl
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, raw, ex=ttl)
+                return
+            except Exception as err:
+                logger.warning("Cache write to Redis failed: %s", err)
+
+        if self.local_fallback:
+            self._local.set(key, raw, ttl)
+
+    def _local_get(self, key: str) -> Optional[bytes]:
+        return self._local.get(key) if self.local_fallback else None
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+
+        self._local.delete(*keys)
+
+        if self._redis is not None:
+            try:
+                for start in range(0, len(keys), 1000):
+                    await self._redis.delete(*keys[start:start + 1000])
+            except Exception as err:
+                logger.warning("Cache invalidation in Redis failed: %s", err)
+
+    async def clear(self) -> None:
+        self._local.clear()
+        self.hits = 0
+        self.misses = 0
+
+    async def close(self) -> None:
+        """
+        Drops pooled Redis connections, which are bound to the event loop
+        that opened them.
+        """
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    @property
+    def backend(self) -> str:
+        if self._redis is not None:
+            return "redis"
+        return "local" if self.local_fallback else "disabled"
+
+    async def check(self) -> None:
+        """
+        Logs a warning at startup if nothing, or only this process's LRU,
+        will be cached.
+        """
+        if self._redis is None:
+            if not self.local_fallback:
+                logger.warning(
+                    "Cache disabled: CACHE_REDIS_URL is empty and the Celery "
+                    "job backend rules out the in-process fallback"
+                )
+            return
+
+        try:
+            await self._redis.ping()
+        except Exception as err:
+            logger.warning(
+                "Cache Redis unreachable (%s); %s until it is",
+                err,
+                "using the in-process LRU" if self.local_fallback
+                else "nothing is cached",
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+cache = Cache(
+    redis_url=CACHE_REDIS_URL,
+    ttl=CACHE_TTL_SECONDS,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_value_bytes=CACHE_MAX_VALUE_BYTES,
+    # Celery workers invalidate entries from their own process.
+    local_fallback=JOB_BACKEND != "celery",
+)
@@ -0,0 +1,222 @@
+import gzip
+import io
+import zlib
+from typing import BinaryIO, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from .const import MAX_DECOMPRESSED_BYTES, UPLOAD_CHUNK_SIZE
+
+# Upload file suffix -> compression
+UPLOAD_SUFFIXES = {
+    ".csv": None,
+    ".csv.gz": "gzip",
+    ".csv.zst": "zstd",
+}
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class CompressionError(ValueError):
+    """
+    Compressed data is corrupt, truncated or of an unsupported format.
+    """
+
+
+class DecompressedSizeExceeded(ValueError):
+    pass
+
+
+def upload_compression(filename: Optional[str]) -> Optional[str]:
+    """
+    Compression of an upload from its file name; raises ValueError if it
+    is not a (compressed) CSV file.
+    """
+    for suffix, compression in UPLOAD_SUFFIXES.items():
+        if (filename or "").lower().endswith(suffix):
+            return compression
+
+    raise ValueError(f"Unsupported upload file name: {filename!r}")
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise CompressionError(
+            "zstd uploads need the 'zstandard' package installed"
+        )
+    return zstandard
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Reads the decompressed content of a gzip or zstd stream, never more
+    than the caller asked for at a time. Decoder errors are raised as
+    CompressionError, and DecompressedSizeExceeded once more than
+    `max_bytes` have been produced (guards against decompression bombs).
+    """
+
+    def __init__(
+        self,
+        raw: BinaryIO,
+        compression: str,
+        max_bytes: int = MAX_DECOMPRESSED_BYTES,
+    ):
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.total = 0
+
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=raw, mode="rb")
+            self._errors = (OSError, EOFError, zlib.error)
+        elif compression == "zstd":
+            zstandard = _zstandard()
+            self._stream = zstandard.ZstdDecompressor().stream_reader(
+                raw, read_across_frames=True, closefd=False
+            )
+            self._errors = (zstandard.ZstdError, OSError)
+        else:
+            raise CompressionError(f"Unsupported compression {compression!r}")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            size = self._stream.readinto(buffer)
+        except self._errors as err:
+            raise CompressionError(
+                f"Invalid {self.compression} data: {err}"
+            ) from err
+
+        self.total += size
+        if self.total > self.max_bytes:
+            raise DecompressedSizeExceeded(
+                f"Decompressed upload exceeds {self.max_bytes} bytes"
+            )
+        return size
+
+
+def open_decompressed(raw: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    """
+    Binary stream of the uncompressed content of `raw`.
+    """
+    if compression is None:
+        return raw
+
+    return io.BufferedReader(
+        DecompressingReader(raw, compression), buffer_size=UPLOAD_CHUNK_SIZE
+    )
+
+
+class GzipRequestMiddleware:
+    """
+    ASGI middleware decompressing `Content-Encoding: gzip` request bodies
+    as they are received, so endpoints read the plain body as a stream.
+    Corrupt bodies are answered with 400 and bodies inflating past
+    MAX_DECOMPRESSED_BYTES with 413.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_DECOMPRESSED_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "").lower()
+        if encoding != "gzip":
+            await self.app(scope, receive, send)
+            return
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value)
+            for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        total = 0
+        failure = None
+        started = False
+        replaced = False
+
+        def _inflate(data: bytes) -> bytes:
+            nonlocal decompressor, total
+            out = []
+
+            while data:
+                if decompressor.eof:
+                    # Next member of a multi-member stream.
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+                limit = self.max_bytes - total + 1
+                piece = decompressor.decompress(data, limit)
+                total += len(piece)
+                if total > self.max_bytes:
+                    raise DecompressedSizeExceeded()
+                out.append(piece)
+                data = decompressor.unconsumed_tail or decompressor.unused_data
+
+            return b"".join(out)
+
+        async def _receive():
+            nonlocal failure
+
+            if failure is not None:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            more_body = message.get("more_body", False)
+            try:
+                body = _inflate(message.get("body", b""))
+                if not more_body:
+                    body += decompressor.flush()
+                    if not decompressor.eof:
+                        raise zlib.error("truncated gzip body")
+            except zlib.error:
+                failure = (400, "Invalid gzip request body")
+                return {"type": "http.disconnect"}
+            except DecompressedSizeExceeded:
+                failure = (
+                    413,
+                    f"Decompressed request body exceeds {self.max_bytes} bytes",
+                )
+                return {"type": "http.disconnect"}
+
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        async def _send_failure():
+            status_code, detail = failure
+            response = JSONResponse({"detail": detail}, status_code=status_code)
+            await response(scope, receive, send)
+
+        async def _send(message):
+            nonlocal started, replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+                if failure is not None:
+                    # Whatever the app made of the cut-off body, answer
+                    # with the actual problem instead.
+                    replaced = True
+                    await _send_failure()
+                    return
+            await send(message)
+
+        try:
+            await self.app(scope, _receive, _send)
+        except Exception:
+            if failure is None or started:
+                raise
+
+        if failure is not None and not started:
+            await _send_failure()
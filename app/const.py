@@ -1,4 +1,70 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 REQUIRED_COLUMNS = {"name", "address"}
 OPTIONAL_COLUMNS = {"phone"}
-ALLOWED_COLUMNS = REQUIRED_COLUMNS | OPTIONAL_COLUMNS
\ No newline at end of file
+ALLOWED_COLUMNS = REQUIRED_COLUMNS | OPTIONAL_COLUMNS
+
+# Column widths of the hospitals table, checked before rows reach the DB.
+COLUMN_MAX_LENGTHS = {"name": 255, "address": 500, "phone": 20}
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+HOSPITAL_BATCH_MAX_ITEMS = int(os.getenv("HOSPITAL_BATCH_MAX_ITEMS", "10000"))
+
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+STREAM_FETCH_SIZE = int(os.getenv("STREAM_FETCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "spool")
+# Where workers read uploads from: "local" (a spool directory shared with
+# the API) or "database" (copied into upload_parts by the API).
+UPLOAD_STORE = os.getenv("UPLOAD_STORE", "local")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Cap on the uncompressed size of compressed uploads and request bodies.
+MAX_DECOMPRESSED_BYTES = int(
+    os.getenv("MAX_DECOMPRESSED_BYTES", str(1024 * 1024 * 1024))
+)
+
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+CSV_MAX_REPORTED_ERRORS = int(os.getenv("CSV_MAX_REPORTED_ERRORS", "100"))
+
+# CSV validation runs off the event loop: "process" or "thread" pool.
+CSV_OFFLOAD_MODE = os.getenv("CSV_OFFLOAD_MODE", "process")
+CSV_OFFLOAD_WORKERS = int(os.getenv("CSV_OFFLOAD_WORKERS", "2"))
+
+BULK_CHECKPOINT_ROWS = int(os.getenv("BULK_CHECKPOINT_ROWS", "5000"))
+BULK_PARALLEL_CHUNK_ROWS = int(os.getenv("BULK_PARALLEL_CHUNK_ROWS", "50000"))
+
+BULK_DEDUP_WINDOW_SECONDS = int(os.getenv("BULK_DEDUP_WINDOW_SECONDS", "3600"))
+
+# The compose Redis by default; set it empty to run without Redis.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://redis:6379/2") or None
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_VALUE_BYTES = int(os.getenv("CACHE_MAX_VALUE_BYTES", str(1024 * 1024)))
+
+# Shared by every API and worker process on a host, so /metrics covers
+# them all (prometheus_client multiprocess mode); unset in one process.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Celery worker's own /metrics port, for workers on other hosts; 0 is off.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", CACHE_REDIS_URL)
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+
+SEARCH_MIN_QUERY_LENGTH = int(os.getenv("SEARCH_MIN_QUERY_LENGTH", "3"))
+
+BATCH_OP_CHUNK_SIZE = int(os.getenv("BATCH_OP_CHUNK_SIZE", "5000"))
+
+# "celery" or "inprocess" (asyncio workers inside the API process).
+JOB_BACKEND = os.getenv("JOB_BACKEND", "celery")
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_SHUTDOWN_SECONDS = int(os.getenv("JOB_SHUTDOWN_SECONDS", "30"))
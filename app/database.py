@@ -1,14 +1,55 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from typing import AsyncGenerator
+import logging
 import os
+import random
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# SQL statement logging is off by default; when enabled, only a sample of
+# statements is logged so it can stay on under load.
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+SQL_ECHO_SAMPLE_RATE = float(os.getenv("SQL_ECHO_SAMPLE_RATE", "1.0"))
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+sql_logger = logging.getLogger("app.sql")
+
+
+def _log_sampled_statement(
+    conn, cursor, statement, parameters, context, executemany
+):
+    if random.random() < SQL_ECHO_SAMPLE_RATE:
+        sql_logger.info("%s %r", statement, parameters)
+
+
+def build_engine(
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+) -> AsyncEngine:
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+    )
+
+    if SQL_ECHO:
+        if not sql_logger.handlers:
+            sql_logger.addHandler(logging.StreamHandler())
+            sql_logger.setLevel(logging.INFO)
+        event.listen(
+            engine.sync_engine, "before_cursor_execute", _log_sampled_statement
+        )
+
+    return engine
+
+
+engine = build_engine()
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -23,4 +64,12 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
 
+
+def get_session_factory() -> sessionmaker:
+    """
+    For endpoints that open their own short sessions, e.g. one per page of
+    a streamed response, instead of holding the request's session.
+    """
+    return AsyncSessionLocal
+
 async_session_factory = AsyncSessionLocal
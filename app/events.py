@@ -0,0 +1,219 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import orjson
+from redis import asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import JobStatus
+from .const import EVENTS_REDIS_URL, SSE_KEEPALIVE_SECONDS, SSE_QUEUE_SIZE
+from .utils import dumps_json
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_BATCH_STATUSES = {"COMPLETED", "COMPLETED_WITH_ERRORS", "FAILED"}
+
+SNAPSHOT_COLUMNS = (
+    JobStatus.batch_id,
+    JobStatus.status,
+    JobStatus.total_hospitals,
+    JobStatus.processed_hospitals,
+    JobStatus.failed_hospitals,
+    JobStatus.duplicate_hospitals,
+)
+
+
+def batch_channel(batch_id: str) -> str:
+    return f"hms:events:batch:{batch_id}"
+
+
+def batch_snapshot(row) -> dict:
+    """
+    Progress document of a batch from a JobStatus or a SNAPSHOT_COLUMNS row.
+    """
+    return {
+        column.key: getattr(row, column.key) for column in SNAPSHOT_COLUMNS
+    }
+
+
+class EventBroker:
+    """
+    Fans published events out to local subscriber queues. With Redis the
+    events go through pub/sub, so the worker's events reach every API
+    process; each process holds one subscriber connection however many
+    clients are listening. Without Redis, events only reach subscribers
+    in the publishing process.
+    """
+
+    def __init__(self, redis_url: Optional[str], queue_size: int):
+        self.queue_size = queue_size
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._redis = aioredis.from_url(redis_url) if redis_url else None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, event: dict) -> None:
+        """
+        Best effort: a lost event only delays the subscriber until its next
+        keepalive re-read.
+        """
+        if self._redis is None:
+            self._dispatch(channel, event)
+            return
+
+        try:
+            await self._redis.publish(channel, dumps_json(event))
+        except Exception as err:
+            logger.warning("Publishing %s to Redis failed: %s", channel, err)
+            self._dispatch(channel, event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        first = channel not in self._queues
+        self._queues.setdefault(channel, set()).add(queue)
+
+        try:
+            if first and self._redis is not None:
+                await self._redis_subscribe(channel)
+            yield queue
+        finally:
+            queues = self._queues.get(channel, set())
+            queues.discard(queue)
+            if not queues:
+                self._queues.pop(channel, None)
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.unsubscribe(channel)
+                    except Exception as err:
+                        logger.warning("Unsubscribing %s failed: %s", channel, err)
+
+    async def _redis_subscribe(self, channel: str) -> None:
+        try:
+            if self._pubsub is None:
+                self._pubsub = self._redis.pubsub()
+            await self._pubsub.subscribe(channel)
+        except Exception as err:
+            logger.warning("Subscribing to %s failed: %s", channel, err)
+            return
+
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except Exception as err:
+                logger.warning("Reading events from Redis failed: %s", err)
+                await asyncio.sleep(1.0)
+                continue
+
+            if message is not None:
+                self._dispatch(
+                    message["channel"].decode(), orjson.loads(message["data"])
+                )
+
+    def _dispatch(self, channel: str, event: dict) -> None:
+        for queue in self._queues.get(channel, ()):
+            if queue.full():
+                # A slow client only needs the latest progress.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+broker = EventBroker(redis_url=EVENTS_REDIS_URL, queue_size=SSE_QUEUE_SIZE)
+
+
+async def publish_batch_progress(batch_id: str, snapshot: dict) -> None:
+    await broker.publish(batch_channel(batch_id), snapshot)
+
+
+async def load_batch_snapshot(db: AsyncSession, batch_id: str) -> Optional[dict]:
+    """
+    Reads the batch's counters (not its hospitals) and ends the
+    transaction, so a long-lived stream does not pin a pooled connection.
+    """
+    result = await db.execute(
+        select(*SNAPSHOT_COLUMNS).where(JobStatus.batch_id == batch_id)
+    )
+    row = result.first()
+    await db.rollback()
+
+    return batch_snapshot(row) if row is not None else None
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps_json(data) + b"\n\n"
+
+
+def _progress(snapshot: dict) -> int:
+    return (
+        snapshot["processed_hospitals"]
+        + snapshot["failed_hospitals"]
+        + snapshot["duplicate_hospitals"]
+    )
+
+
+async def batch_event_stream(
+    db: AsyncSession,
+    batch_id: str,
+) -> AsyncIterator[bytes]:
+    """
+    SSE stream of a batch's progress: the current snapshot, then one
+    `progress` event per published checkpoint, ending with a `done` event
+    once the batch reaches a terminal status (or `deleted` if it goes
+    away). Every SSE_KEEPALIVE_SECONDS without an event the snapshot is
+    re-read, which also covers events missed while Redis was unavailable.
+    """
+    async with broker.subscribe(batch_channel(batch_id)) as queue:
+        # Read after subscribing, so no checkpoint falls in between.
+        last = await load_batch_snapshot(db, batch_id)
+
+        while True:
+            if last is None:
+                yield format_sse("deleted", {"batch_id": batch_id})
+                return
+
+            if last["status"] in TERMINAL_BATCH_STATUSES:
+                yield format_sse("done", last)
+                return
+
+            yield format_sse("progress", last)
+
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(
+                        queue.get(), SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    snapshot = await load_batch_snapshot(db, batch_id)
+                    if snapshot == last:
+                        yield b": keepalive\n\n"
+                        continue
+
+                # Parallel chunks may publish out of order.
+                if (
+                    snapshot is not None
+                    and snapshot["status"] == last["status"]
+                    and _progress(snapshot) <= _progress(last)
+                ):
+                    continue
+
+                last = snapshot
+                break
@@ -0,0 +1,612 @@
+import asyncio
+import csv
+import itertools
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import Numeric, cast, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Hospital, BatchRowError, JobStatus, ImportChunk
+from .cache import cache, batch_key
+from .events import SNAPSHOT_COLUMNS, batch_snapshot, publish_batch_progress
+from .const import (
+    BULK_INSERT_CHUNK_SIZE,
+    BULK_CHECKPOINT_ROWS,
+    BULK_PARALLEL_CHUNK_ROWS,
+)
+from .storage import discard_upload, local_upload
+from .utils import check_row, hospital_dedup_key
+
+# (row_number, hospital_key, error)
+RowError = Tuple[int, str, str]
+
+STAGES = ("parse", "validate", "insert", "commit")
+
+
+@dataclass
+class StageTimings:
+    """
+    Seconds spent per import stage, rows read, and the largest multi-row
+    INSERT and uncommitted transaction seen. Kept per chunk in
+    import_chunks.timings and summed onto the job by finalize_import.
+    """
+    parse: float = 0.0
+    validate: float = 0.0
+    insert: float = 0.0
+    commit: float = 0.0
+    rows: int = 0
+    peak_insert_rows: int = 0
+    peak_uncommitted_rows: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "StageTimings":
+        data = data or {}
+        return cls(**{f.name: data.get(f.name, f.default) for f in fields(cls)})
+
+    def as_dict(self) -> dict:
+        return {
+            key: round(value, 4) if isinstance(value, float) else value
+            for key, value in asdict(self).items()
+        }
+
+    def merge(self, other: "StageTimings") -> None:
+        for stage in STAGES:
+            setattr(self, stage, getattr(self, stage) + getattr(other, stage))
+        self.rows += other.rows
+        self.peak_insert_rows = max(self.peak_insert_rows, other.peak_insert_rows)
+        self.peak_uncommitted_rows = max(
+            self.peak_uncommitted_rows, other.peak_uncommitted_rows
+        )
+
+    def summary(
+        self, wall_seconds: float, chunks: int, queue_wait: float = 0.0
+    ) -> dict:
+        """
+        Job-level view: stage seconds are summed over chunks, so with
+        parallel chunks they can add up to more than the wall-clock time.
+        queue_wait is the time the batch waited for a worker, which the
+        wall-clock time does not include.
+        """
+        return {
+            "stages": {
+                "queue_wait": round(queue_wait, 4),
+                **{stage: round(getattr(self, stage), 4) for stage in STAGES},
+            },
+            "rows": self.rows,
+            "rows_per_second": (
+                round(self.rows / wall_seconds, 1) if wall_seconds else None
+            ),
+            "wall_seconds": wall_seconds,
+            "chunks": chunks,
+            "peak_insert_rows": self.peak_insert_rows,
+            "peak_uncommitted_rows": self.peak_uncommitted_rows,
+        }
+
+
+def iter_chunks(
+    rows: Iterable[dict], size: int, start: int = 1
+) -> Iterator[List[Tuple[int, dict]]]:
+    """
+    Groups CSV rows into lists of (row_number, row) of at most `size`.
+    """
+    chunk: List[Tuple[int, dict]] = []
+
+    for idx, row in enumerate(rows, start=start):
+        chunk.append((idx, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+class OffsetLines:
+    """
+    Feeds the lines of a binary CSV stream to csv.reader as text, keeping
+    the byte offset just past the last line handed out. csv.reader pulls
+    exactly the lines of one record at a time, so after each record
+    `offset` is where the next one starts.
+    """
+
+    def __init__(self, stream: BinaryIO, offset: int = 0):
+        self.stream = stream
+        self.offset = offset
+
+    def __iter__(self) -> "OffsetLines":
+        return self
+
+    def __next__(self) -> str:
+        line = self.stream.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8")
+
+
+def scan_row_offsets(
+    path: Union[str, Path], rows: Iterable[int]
+) -> Dict[int, int]:
+    """
+    Byte offsets at which the given data rows of a CSV file start
+    (numbered like csv.DictReader rows, from 1), found in one pass. Rows
+    past the end map to the end of the file.
+    """
+    wanted = set(rows)
+    offsets: Dict[int, int] = {}
+
+    with open(path, "rb") as stream:
+        lines = OffsetLines(stream)
+        reader = csv.reader(lines)
+        next(reader, None)
+
+        start = lines.offset
+        row_number = 1
+        for record in reader:
+            if len(offsets) == len(wanted):
+                break
+            # DictReader skips blank lines without numbering them.
+            if record:
+                if row_number in wanted:
+                    offsets[row_number] = start
+                row_number += 1
+            start = lines.offset
+
+        for row_number in wanted - offsets.keys():
+            offsets[row_number] = lines.offset
+
+    return offsets
+
+
+def hospital_key(idx: int, row: dict) -> str:
+    return row.get("name") or f"row_{idx}"
+
+
+def validate_row(row: dict) -> Optional[str]:
+    """
+    Returns the reason a row cannot be inserted, or None if it is valid.
+    """
+    problems = check_row(row)
+    if not problems:
+        return None
+
+    return "; ".join(message for _, message in problems)
+
+
+def insert_hospitals_statement(*returning):
+    """
+    Multi-row INSERT that skips hospitals whose dedup_key already exists
+    and returns `returning` (by default the dedup_key) of the rows it did
+    insert.
+    """
+    return (
+        pg_insert(Hospital)
+        .on_conflict_do_nothing(index_elements=["dedup_key"])
+        .returning(*(returning or (Hospital.dedup_key,)))
+    )
+
+
+async def insert_chunk(
+    db: AsyncSession,
+    batch_id: str,
+    chunk: List[Tuple[int, dict]],
+    seen: Optional[Set[str]] = None,
+    timings: Optional[StageTimings] = None,
+) -> Tuple[int, int, List[RowError]]:
+    """
+    Validates a chunk in memory and writes the valid rows with one
+    multi-row INSERT. If the chunk is rejected by the database, its rows
+    are retried one by one so the failure is attributed to the right row.
+
+    Duplicates are skipped: within the batch through the `seen` set of
+    dedup keys, against existing hospitals through ON CONFLICT on the
+    unique dedup_key index.
+
+    Returns the number of inserted hospitals, the number of duplicates
+    skipped and a list of (row_number, hospital_key, error) for the rows
+    that failed. Validation and insert time is added to `timings`.
+    """
+    if seen is None:
+        seen = set()
+    if timings is None:
+        timings = StageTimings()
+
+    started = time.perf_counter()
+
+    errors: List[RowError] = []
+    pending: List[Tuple[int, str, dict]] = []
+    duplicates = 0
+
+    for idx, row in chunk:
+        error = validate_row(row)
+        if error:
+            errors.append((idx, hospital_key(idx, row), error))
+            continue
+
+        dedup_key = hospital_dedup_key(row["name"], row["address"])
+        if dedup_key in seen:
+            duplicates += 1
+            continue
+        seen.add(dedup_key)
+
+        pending.append((
+            idx,
+            hospital_key(idx, row),
+            {
+                "name": row["name"],
+                "address": row["address"],
+                "phone": row.get("phone") or None,
+                "creation_batch_id": batch_id,
+                "is_active": False,
+                "dedup_key": dedup_key,
+            },
+        ))
+
+    validated = time.perf_counter()
+    timings.validate += validated - started
+
+    if not pending:
+        return 0, duplicates, errors
+
+    timings.peak_insert_rows = max(timings.peak_insert_rows, len(pending))
+    try:
+        async with db.begin_nested():
+            result = await db.execute(
+                insert_hospitals_statement(),
+                [values for _, _, values in pending],
+            )
+            inserted = len(result.all())
+        timings.insert += time.perf_counter() - validated
+        return inserted, duplicates + len(pending) - inserted, errors
+    except Exception:
+        pass
+
+    inserted = 0
+    for idx, key, values in pending:
+        try:
+            async with db.begin_nested():
+                result = await db.execute(insert_hospitals_statement(), [values])
+                if result.first() is None:
+                    duplicates += 1
+                else:
+                    inserted += 1
+        except Exception as err:
+            errors.append((idx, key, str(err)))
+
+    timings.insert += time.perf_counter() - validated
+    return inserted, duplicates, errors
+
+
+async def record_row_errors(
+    db: AsyncSession,
+    batch_id: str,
+    errors: List[RowError],
+) -> None:
+    """
+    Bulk-inserts the failed rows of a chunk into batch_row_errors.
+    """
+    if not errors:
+        return
+
+    await db.execute(
+        insert(BatchRowError),
+        [
+            {
+                "batch_id": batch_id,
+                "row_number": idx,
+                "hospital_key": key,
+                "error": error,
+            }
+            for idx, key, error in errors
+        ],
+    )
+
+
+def elapsed_seconds():
+    """
+    SQL expression for the seconds since the import started, or since
+    the job was created if no worker has picked it up yet.
+    """
+    started_at = func.coalesce(JobStatus.started_at, JobStatus.created_at)
+    return func.round(
+        cast(func.extract("epoch", func.now() - started_at), Numeric),
+        2,
+    )
+
+
+async def plan_import_chunks(
+    db: AsyncSession,
+    batch_id: str,
+    upload_ref: str,
+) -> List[Tuple[int, int]]:
+    """
+    Splits a batch into row ranges of BULK_PARALLEL_CHUNK_ROWS and records
+    one import_chunks row per range. Planning again is a no-op for ranges
+    that already exist, so a retried dispatcher keeps their checkpoints.
+
+    Returns the (start_row, end_row) ranges to import, or an empty list
+    if there is nothing left to do.
+    """
+    result = await db.execute(
+        select(JobStatus).where(JobStatus.batch_id == batch_id)
+    )
+    job = result.scalar_one_or_none()
+
+    if job is None or job.status != "IN_PROGRESS":
+        # Either deleted or a previous attempt already finished it.
+        await discard_upload(db, batch_id, upload_ref)
+        await db.commit()
+        return []
+
+    if job.started_at is None:
+        # Kept by retries, so processing time excludes only the queue wait.
+        job.started_at = datetime.now(timezone.utc)
+
+    ranges = [
+        (start, min(start + BULK_PARALLEL_CHUNK_ROWS - 1, job.total_hospitals))
+        for start in range(1, job.total_hospitals + 1, BULK_PARALLEL_CHUNK_ROWS)
+    ]
+
+    try:
+        async with local_upload(db, batch_id, upload_ref) as path:
+            # One pass over the file, so chunks can seek to their first
+            # row instead of each re-reading everything before it.
+            offsets = await asyncio.to_thread(
+                scan_row_offsets, path, [start for start, _ in ranges]
+            )
+    except FileNotFoundError:
+        job.status = "FAILED"
+        job.sys_custom_fields["error"] = "Uploaded file not found"
+        await db.commit()
+        return []
+
+    if ranges:
+        await db.execute(
+            pg_insert(ImportChunk)
+            .values([
+                {
+                    "batch_id": batch_id,
+                    "start_row": start,
+                    "end_row": end,
+                    "checkpoint_row": start - 1,
+                    "checkpoint_offset": offsets[start],
+                    "status": "PENDING",
+                }
+                for start, end in ranges
+            ])
+            .on_conflict_do_nothing(
+                constraint="uq_import_chunks_batch_id_start_row"
+            )
+        )
+    await db.commit()
+
+    return ranges
+
+
+async def import_chunk(
+    db: AsyncSession,
+    batch_id: str,
+    upload_ref: str,
+    start_row: int,
+    end_row: int,
+) -> None:
+    """
+    Imports rows start_row..end_row of a spooled CSV, reading from the
+    byte offset of the chunk's checkpoint rather than the top of the file.
+    Every
+    BULK_CHECKPOINT_ROWS rows the inserted hospitals, their row errors,
+    the chunk checkpoint and an atomic increment of the job counters are
+    committed together, so a retry resumes after the last checkpoint
+    without inserting or counting anything twice.
+
+    Stage timings accumulate in import_chunks.timings across attempts.
+    """
+    result = await db.execute(
+        select(ImportChunk).where(
+            ImportChunk.batch_id == batch_id,
+            ImportChunk.start_row == start_row,
+        )
+    )
+    chunk_state = result.scalar_one_or_none()
+
+    if chunk_state is None or chunk_state.status == "COMPLETED":
+        return
+
+    checkpoint_row = chunk_state.checkpoint_row
+    checkpoint_offset = chunk_state.checkpoint_offset
+    processed = 0
+    failed = 0
+    duplicates = 0
+    seen: Set[str] = set()
+    timings = StageTimings.from_dict(chunk_state.timings)
+
+    async def _checkpoint(
+        last_row: int, offset: int, completed: bool = False
+    ) -> None:
+        nonlocal processed, failed, duplicates
+
+        started = time.perf_counter()
+        chunk_state.checkpoint_row = last_row
+        chunk_state.checkpoint_offset = offset
+        chunk_state.timings = timings.as_dict()
+        if completed:
+            chunk_state.status = "COMPLETED"
+
+        result = await db.execute(
+            update(JobStatus)
+            .where(JobStatus.batch_id == batch_id)
+            .values(
+                processed_hospitals=JobStatus.processed_hospitals + processed,
+                failed_hospitals=JobStatus.failed_hospitals + failed,
+                duplicate_hospitals=JobStatus.duplicate_hospitals + duplicates,
+                processing_time_seconds=elapsed_seconds(),
+            )
+            .returning(*SNAPSHOT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        progress = result.first()
+        await db.commit()
+        timings.commit += time.perf_counter() - started
+
+        if progress is not None:
+            await publish_batch_progress(batch_id, batch_snapshot(progress))
+
+        processed = 0
+        failed = 0
+        duplicates = 0
+
+    async with local_upload(db, batch_id, upload_ref) as path:
+        if checkpoint_offset is None:
+            # Planned before offsets were recorded.
+            offsets = await asyncio.to_thread(
+                scan_row_offsets, path, [checkpoint_row + 1]
+            )
+            checkpoint_offset = offsets[checkpoint_row + 1]
+
+        with open(path, "rb") as stream:
+            lines = OffsetLines(stream)
+            fieldnames = next(csv.reader(lines), None)
+            stream.seek(checkpoint_offset)
+            lines.offset = checkpoint_offset
+
+            reader = csv.DictReader(lines, fieldnames=fieldnames)
+            rows = itertools.islice(reader, end_row - checkpoint_row)
+            chunks = iter_chunks(
+                rows, BULK_INSERT_CHUNK_SIZE, start=checkpoint_row + 1
+            )
+            uncommitted = 0
+
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                timings.parse += time.perf_counter() - started
+                if chunk is None:
+                    break
+
+                inserted, skipped, errors = await insert_chunk(
+                    db, batch_id, chunk, seen, timings
+                )
+                processed += inserted
+                duplicates += skipped
+                failed += len(errors)
+
+                started = time.perf_counter()
+                await record_row_errors(db, batch_id, errors)
+                timings.insert += time.perf_counter() - started
+
+                timings.rows += len(chunk)
+                checkpoint_row = chunk[-1][0]
+                # Nothing past the chunk's last row has been read yet.
+                checkpoint_offset = lines.offset
+                uncommitted += len(chunk)
+                timings.peak_uncommitted_rows = max(
+                    timings.peak_uncommitted_rows, uncommitted
+                )
+                if uncommitted >= BULK_CHECKPOINT_ROWS:
+                    await _checkpoint(checkpoint_row, checkpoint_offset)
+                    uncommitted = 0
+
+    await _checkpoint(checkpoint_row, checkpoint_offset, completed=True)
+
+    # The last commit's own duration is only known once it is done.
+    chunk_state.timings = timings.as_dict()
+    await db.commit()
+
+
+async def finalize_import(
+    db: AsyncSession,
+    batch_id: str,
+    upload_ref: str,
+) -> None:
+    """
+    Sets the final status, wall-clock processing time (from the start of
+    the import, not the batch's creation) and the stage timings summed
+    over the batch's chunks once every chunk has completed, and drops the
+    upload.
+    """
+    result = await db.execute(
+        select(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .with_for_update()
+    )
+    job = result.scalar_one_or_none()
+
+    if job is None or job.status != "IN_PROGRESS":
+        await discard_upload(db, batch_id, upload_ref)
+        await db.commit()
+        return
+
+    result = await db.execute(
+        select(ImportChunk.status, ImportChunk.timings)
+        .where(ImportChunk.batch_id == batch_id)
+    )
+    chunks = result.all()
+
+    pending = sum(1 for status, _ in chunks if status != "COMPLETED")
+    if pending:
+        raise RuntimeError(
+            f"Batch {batch_id} still has {pending} unfinished chunks"
+        )
+
+    timings = StageTimings()
+    for _, chunk_timings in chunks:
+        timings.merge(StageTimings.from_dict(chunk_timings))
+
+    job.status = (
+        "COMPLETED" if not job.failed_hospitals else "COMPLETED_WITH_ERRORS"
+    )
+    started_at = job.started_at or job.created_at
+    job.processing_time_seconds = round(
+        (datetime.now(timezone.utc) - started_at).total_seconds(), 2
+    )
+    job.timings = timings.summary(
+        job.processing_time_seconds,
+        len(chunks),
+        queue_wait=(started_at - job.created_at).total_seconds(),
+    )
+    await discard_upload(db, batch_id, upload_ref)
+    await db.commit()
+
+    await cache.invalidate([batch_key(batch_id)])
+    await publish_batch_progress(batch_id, batch_snapshot(job))
+
+
+async def fail_import(db: AsyncSession, batch_id: str, error: str) -> None:
+    result = await db.execute(
+        update(JobStatus)
+        .where(
+            JobStatus.batch_id == batch_id,
+            JobStatus.status == "IN_PROGRESS",
+        )
+        .values(
+            status="FAILED",
+            processing_time_seconds=elapsed_seconds(),
+            sys_custom_fields=JobStatus.sys_custom_fields.op("||")(
+                func.jsonb_build_object("error", error)
+            ),
+        )
+        .returning(*SNAPSHOT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    failed = result.first()
+    if failed is not None:
+        await discard_upload(db, batch_id)
+    await db.commit()
+
+    if failed is not None:
+        await publish_batch_progress(batch_id, batch_snapshot(failed))
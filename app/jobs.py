@@ -0,0 +1,392 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import sessionmaker
+
+from . import metrics
+from .batch_ops import (
+    activate_batch_hospitals,
+    delete_batch_rows,
+    fail_batch_activation,
+    fail_batch_deletion,
+)
+from .const import (
+    JOB_BACKEND,
+    JOB_CONCURRENCY,
+    JOB_QUEUE_SIZE,
+    JOB_SHUTDOWN_SECONDS,
+)
+from .database import AsyncSessionLocal
+from .ingestion import (
+    fail_import,
+    finalize_import,
+    import_chunk,
+    plan_import_chunks,
+)
+from models import JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Job name -> Celery task in worker.tasks.
+CELERY_TASKS = {
+    "bulk_import": "process_bulk_hospitals",
+    "activate_batch": "activate_batch_task",
+    "delete_batch": "delete_batch_task",
+}
+
+# Jobs working on one batch (their first argument), which recover() can
+# submit again when they were left unfinished.
+BATCH_JOBS = ("bulk_import", "activate_batch", "delete_batch")
+
+# Same policy as the Celery tasks' retry_kwargs.
+MAX_RETRIES = 3
+RETRY_DELAY_SECONDS = 5
+
+
+class CeleryBackend:
+    """
+    Hands jobs to the Celery worker through the broker.
+    """
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def recover(self) -> None:
+        # The broker redelivers unfinished tasks (task_acks_late).
+        pass
+
+    async def submit(self, name: str, *args: Any) -> None:
+        # Resolved per call so tests can patch the task's delay().
+        from worker import tasks
+
+        getattr(tasks, CELERY_TASKS[name]).delay(*args)
+
+
+async def _bulk_import(
+    factory: sessionmaker, batch_id: str, upload_ref: str
+) -> None:
+    async with factory() as db:
+        ranges = await plan_import_chunks(db, batch_id, upload_ref)
+
+    if not ranges:
+        return
+
+    for start_row, end_row in ranges:
+        async with factory() as db:
+            await import_chunk(db, batch_id, upload_ref, start_row, end_row)
+
+    async with factory() as db:
+        await finalize_import(db, batch_id, upload_ref)
+
+
+async def _fail_bulk_import(
+    factory: sessionmaker, batch_id: str, upload_ref: str
+) -> None:
+    async with factory() as db:
+        await fail_import(db, batch_id, "Import failed")
+
+
+async def _activate_batch(factory: sessionmaker, batch_id: str) -> None:
+    async with factory() as db:
+        await activate_batch_hospitals(db, batch_id)
+
+
+async def _fail_activate_batch(factory: sessionmaker, batch_id: str) -> None:
+    async with factory() as db:
+        await fail_batch_activation(db, batch_id, "Activation failed")
+
+
+async def _delete_batch(factory: sessionmaker, batch_id: str) -> None:
+    async with factory() as db:
+        await delete_batch_rows(db, batch_id)
+
+
+async def _fail_delete_batch(factory: sessionmaker, batch_id: str) -> None:
+    async with factory() as db:
+        await fail_batch_deletion(db, batch_id, "Deletion failed")
+
+
+JobFunc = Callable[..., Awaitable[None]]
+
+# Job name -> (job, called once retries are exhausted)
+IN_PROCESS_JOBS: Dict[str, Tuple[JobFunc, Optional[JobFunc]]] = {
+    "bulk_import": (_bulk_import, _fail_bulk_import),
+    "activate_batch": (_activate_batch, _fail_activate_batch),
+    "delete_batch": (_delete_batch, _fail_delete_batch),
+}
+
+
+class InProcessBackend:
+    """
+    Runs jobs on the API's own event loop: a bounded queue drained by
+    `concurrency` worker tasks, reusing the same ingestion and batch
+    operation code as the Celery tasks. submit() waits while the queue is
+    full, which pushes back on the callers instead of growing memory.
+
+    While a batch's job is queued or running, this process holds a
+    Postgres advisory lock for it on a connection of its own. recover()
+    submits again the batches left unfinished whose lock nobody holds,
+    i.e. whose process stopped or died; the lock goes with the connection.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        concurrency: int,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        retry_delay: float = RETRY_DELAY_SECONDS,
+    ):
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner: Optional[AsyncConnection] = None
+        self._owner_lock: Optional[asyncio.Lock] = None
+        self._recovery: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._owner = None
+        self._owner_lock = asyncio.Lock()
+        self._recovery = None
+        # A fresh context, so jobs started lazily from a request do not
+        # inherit its per-request state (e.g. metrics).
+        self._workers = [
+            asyncio.create_task(self._work(), context=contextvars.Context())
+            for _ in range(self.concurrency)
+        ]
+
+    async def stop(self, timeout: float = JOB_SHUTDOWN_SECONDS) -> None:
+        if not self._workers:
+            return
+
+        if self._recovery is not None:
+            self._recovery.cancel()
+            await asyncio.gather(self._recovery, return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Stopping with %d queued jobs unfinished", self._queue.qsize()
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Releases the locks of jobs that did not finish.
+        await self._close_owner()
+
+    async def submit(self, name: str, *args: Any) -> None:
+        if name not in IN_PROCESS_JOBS:
+            raise KeyError(name)
+
+        # Started lazily when no lifespan ran (e.g. ASGI test clients).
+        await self.start()
+
+        owned = name in BATCH_JOBS
+        if owned and not await self._claim(name, args[0]):
+            logger.info("Job %s%r is owned by another process", name, args)
+            return
+
+        try:
+            await self._queue.put((name, args))
+        except BaseException:
+            if owned:
+                await self._release(name, args[0])
+            raise
+
+    async def recover(self) -> None:
+        """
+        Starts submitting again, in the background, the imports,
+        activations and deletions that no live process owns. An import
+        without a stored upload reference cannot be resumed and is marked
+        FAILED instead.
+        """
+        await self.start()
+        self._recovery = asyncio.create_task(
+            self._recover(), context=contextvars.Context()
+        )
+
+    async def join(self) -> None:
+        """
+        Waits until recovery and every submitted job have finished.
+        """
+        if self._recovery is not None:
+            await self._recovery
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _recover(self) -> None:
+        activation = JobStatus.sys_custom_fields["activation"]["status"].astext
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(
+                    JobStatus.batch_id,
+                    JobStatus.status,
+                    JobStatus.upload_ref,
+                    activation.label("activation"),
+                )
+                .where(or_(
+                    JobStatus.status.in_(("IN_PROGRESS", "DELETING")),
+                    activation == "IN_PROGRESS",
+                ))
+                .order_by(JobStatus.created_at)
+            )
+            batches = result.all()
+
+            for batch in batches:
+                if batch.status != "IN_PROGRESS" or batch.upload_ref is not None:
+                    continue
+                if await self._claim("bulk_import", batch.batch_id):
+                    try:
+                        await fail_import(db, batch.batch_id, "Import interrupted")
+                    finally:
+                        await self._release("bulk_import", batch.batch_id)
+
+        for batch in batches:
+            if batch.status == "IN_PROGRESS" and batch.upload_ref is not None:
+                await self.submit("bulk_import", batch.batch_id, batch.upload_ref)
+            elif batch.status == "DELETING":
+                await self.submit("delete_batch", batch.batch_id)
+            if batch.activation == "IN_PROGRESS":
+                await self.submit("activate_batch", batch.batch_id)
+
+    async def _owner_connection(self) -> AsyncConnection:
+        if self._owner is None:
+            engine = self.session_factory.kw["bind"]
+            connection = await engine.connect()
+            self._owner = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+        return self._owner
+
+    async def _close_owner(self) -> None:
+        if self._owner is not None:
+            owner, self._owner = self._owner, None
+            try:
+                await owner.close()
+            except Exception:
+                logger.warning("Closing the job lock connection failed")
+
+    async def _claim(self, name: str, batch_id: str) -> bool:
+        """
+        Takes the lock marking this process as the owner of the batch's
+        job. Session-level advisory locks nest, so a job submitted twice
+        here is claimed (and released) twice.
+        """
+        async with self._owner_lock:
+            owner = await self._owner_connection()
+            try:
+                return await owner.scalar(
+                    select(func.pg_try_advisory_lock(_lock_key(name, batch_id)))
+                )
+            except Exception:
+                await self._close_owner()
+                raise
+
+    async def _release(self, name: str, batch_id: str) -> None:
+        async with self._owner_lock:
+            if self._owner is None:
+                # Lost with the connection already.
+                return
+            try:
+                await self._owner.scalar(
+                    select(func.pg_advisory_unlock(_lock_key(name, batch_id)))
+                )
+            except Exception:
+                logger.warning(
+                    "Releasing the lock of job %s(%r) failed", name, batch_id
+                )
+                await self._close_owner()
+
+    async def _work(self) -> None:
+        while True:
+            name, args = await self._queue.get()
+            try:
+                await self._run(name, args)
+            finally:
+                if name in BATCH_JOBS:
+                    await self._release(name, args[0])
+                self._queue.task_done()
+
+    async def _run(self, name: str, args: tuple) -> None:
+        job, on_failure = IN_PROCESS_JOBS[name]
+        started = time.perf_counter()
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                await job(self.session_factory, *args)
+                state = "SUCCESS"
+                break
+            except Exception:
+                logger.exception(
+                    "Job %s%r failed (attempt %d)", name, args, attempt + 1
+                )
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(self.retry_delay)
+        else:
+            state = "FAILURE"
+            if on_failure is not None:
+                try:
+                    await on_failure(self.session_factory, *args)
+                except Exception:
+                    logger.exception(
+                        "Failure handler of job %s%r failed", name, args
+                    )
+
+        metrics.record_task(name, state, time.perf_counter() - started)
+
+
+def _lock_key(name: str, batch_id: str):
+    return func.hashtext(f"hms-job:{name}:{batch_id}")
+
+
+def build_backend(name: str):
+    if name == "celery":
+        return CeleryBackend()
+    if name == "inprocess":
+        return InProcessBackend(
+            queue_size=JOB_QUEUE_SIZE,
+            concurrency=JOB_CONCURRENCY,
+        )
+    raise ValueError(
+        f"Unknown JOB_BACKEND {name!r}, expected 'celery' or 'inprocess'"
+    )
+
+
+backend = build_backend(JOB_BACKEND)
+
+
+async def submit(name: str, *args: Any) -> None:
+    await backend.submit(name, *args)
+
+
+async def start() -> None:
+    await backend.start()
+
+
+async def stop() -> None:
+    await backend.stop()
+
+
+async def recover() -> None:
+    await backend.recover()
@@ -1,48 +1,497 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException,Depends
-from sqlalchemy import select, update, delete
+from fastapi import FastAPI, UploadFile, File, HTTPException,Depends, Query, Response, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update, func, or_, case, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from uuid import uuid4
-import csv
-import io
-
-from .database import get_db
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional
+import logging
+import orjson
+from pydantic import ValidationError
+
+from .database import get_db, get_session_factory
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 from .serializers import (
     HospitalCreate,
     HospitalResponse,
+    HospitalPage,
+    BatchRowErrorPage,
+    BatchSummaryPage,
+    HospitalSearchPage,
+)
+from models import Hospital, JobStatus, BatchRowError
+from .utils import (
+    CsvValidationReport,
+    check_row,
+    validate_csv_file,
+    encode_cursor,
+    decode_cursor,
+    escape_like,
+    hospital_dedup_key,
+)
+from .streaming import (
+    stream_hospitals_ndjson,
+    stream_hospitals_csv,
+    stream_pages,
+    gzip_stream,
+    iter_ndjson,
+)
+from .ingestion import insert_hospitals_statement
+from .compression import (
+    CompressionError,
+    DecompressedSizeExceeded,
+    GzipRequestMiddleware,
+    upload_compression,
+)
+from .batch_ops import fail_batch_activation, fail_batch_deletion
+from .storage import spool_upload, spool_path, remove_spooled, store_upload
+from .cache import cache, hospital_key, batch_key, CACHEABLE_BATCH_STATUSES
+from . import jobs
+from . import offload
+from .events import batch_event_stream
+from .responses import (
+    FastJSONResponse,
+    HOSPITAL_COLUMNS,
+    BATCH_SUMMARY_COLUMNS,
+    hospital_dicts,
+    batch_summary_dicts,
+)
+from . import metrics
+from .const import (
+    BULK_MAX_ROWS,
+    BULK_INSERT_CHUNK_SIZE,
+    HOSPITAL_BATCH_MAX_ITEMS,
+    BULK_DEDUP_WINDOW_SECONDS,
+    LIST_DEFAULT_LIMIT,
+    LIST_MAX_LIMIT,
+    SEARCH_MIN_QUERY_LENGTH,
+    RESPONSE_GZIP_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+    UPLOAD_STORE,
 )
-from models import Hospital, JobStatus
-from .utils import validate_csv_text
 
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await cache.check()
+    await jobs.start()
+    await jobs.recover()
+    yield
+    await jobs.stop()
+    offload.shutdown()
+    metrics.mark_process_dead()
+
+
+app = FastAPI(lifespan=lifespan)
+# Innermost first: request bodies are inflated before the endpoint reads
+# them, and responses are compressed before metrics see them.
+app.add_middleware(GzipRequestMiddleware)
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=RESPONSE_GZIP_MIN_BYTES,
+    compresslevel=RESPONSE_GZIP_LEVEL,
+)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _upload_compression(filename: Optional[str]) -> Optional[str]:
+    try:
+        return upload_compression(filename)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV files (.csv, .csv.gz or .csv.zst) are allowed"
+        )
+
+
+def _decompression_error(err: ValueError) -> HTTPException:
+    if isinstance(err, DecompressedSizeExceeded):
+        return HTTPException(status_code=413, detail=str(err))
+    return HTTPException(status_code=400, detail=str(err))
 
 
 @app.post("/hospitals", response_model=HospitalResponse, status_code=201)
 async def create_hospital(payload: HospitalCreate, db: AsyncSession = Depends(get_db)):
-   hospital = Hospital(
-        name=payload.name,
-        address=payload.address,
-        phone=payload.phone,    
-        creation_batch_id=None,
-        is_active=payload.is_active,
+   result = await db.execute(
+        pg_insert(Hospital)
+        .values(
+            name=payload.name,
+            address=payload.address,
+            phone=payload.phone,
+            creation_batch_id=None,
+            is_active=payload.is_active,
+            dedup_key=hospital_dedup_key(payload.name, payload.address),
+        )
+        .on_conflict_do_nothing(index_elements=["dedup_key"])
+        .returning(Hospital)
     )
-   db.add(hospital)
+   hospital = result.scalar_one_or_none()
+
+   if hospital is None:
+       raise HTTPException(
+           status_code=409,
+           detail="A hospital with this name and address already exists"
+       )
+
    await db.commit()
-   await db.refresh(hospital)
+   await cache.invalidate([hospital_key(hospital.id)])
    return hospital
 
 
-@app.get("/hospitals")
-async def list_hospitals( db: AsyncSession = Depends(get_db),):
-    result = await db.execute(select(Hospital))
-    hospitals = result.scalars().all()
-    return hospitals
+async def _json_array_items(request: Request):
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+
+    for item in payload:
+        yield item
+
+
+def _validation_message(err: ValidationError) -> str:
+    messages = []
+    for error in err.errors():
+        location = ".".join(str(part) for part in error["loc"]) or "item"
+        messages.append(f"{location}: {error['msg']}")
+    return "; ".join(messages)
+
+
+@app.post("/hospitals/batch", status_code=201)
+async def create_hospitals_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Creates up to HOSPITAL_BATCH_MAX_ITEMS hospitals from a JSON array or
+    an NDJSON stream of HospitalCreate objects, all or nothing. Items are
+    validated as they are read and inserted BULK_INSERT_CHUNK_SIZE at a
+    time with INSERT ... RETURNING, in one transaction.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "application/x-ndjson":
+        items = iter_ndjson(request.stream())
+    elif content_type == "application/json":
+        items = _json_array_items(request)
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send application/json or application/x-ndjson",
+        )
+
+    report = CsvValidationReport()
+    created = []
+    duplicates = []
+    seen = set()
+    pending = []
+
+    async def _flush():
+        result = await db.execute(
+            insert_hospitals_statement(
+                Hospital.id, Hospital.created_at, Hospital.dedup_key
+            ),
+            [values for _, values in pending],
+        )
+        inserted = {row.dedup_key: row for row in result}
+
+        for index, values in pending:
+            row = inserted.get(values["dedup_key"])
+            if row is None:
+                duplicates.append(index)
+            else:
+                created.append(
+                    {"index": index, "id": row.id, "created_at": row.created_at}
+                )
+        pending.clear()
+
+    async for item in items:
+        index = report.total_rows
+        report.total_rows += 1
+
+        if report.total_rows > HOSPITAL_BATCH_MAX_ITEMS:
+            await db.rollback()
+            raise HTTPException(
+                status_code=413,
+                detail=(
+                    f"At most {HOSPITAL_BATCH_MAX_ITEMS} hospitals per request"
+                ),
+            )
+
+        try:
+            if isinstance(item, bytes):
+                hospital = HospitalCreate.model_validate_json(item)
+            else:
+                hospital = HospitalCreate.model_validate(item)
+        except ValidationError as err:
+            report.add_error(
+                "invalid", f"Item {index}: {_validation_message(err)}"
+            )
+            continue
+
+        problems = check_row(hospital.model_dump())
+        for error_type, message in problems:
+            report.add_error(error_type, f"Item {index}: {message}")
+
+        # After the first error only keep validating, for the report.
+        if not report.is_valid:
+            continue
+
+        dedup_key = hospital_dedup_key(hospital.name, hospital.address)
+        if dedup_key in seen:
+            duplicates.append(index)
+            continue
+        seen.add(dedup_key)
+
+        pending.append((index, {
+            "name": hospital.name,
+            "address": hospital.address,
+            "phone": hospital.phone,
+            "creation_batch_id": None,
+            "is_active": hospital.is_active,
+            "dedup_key": dedup_key,
+        }))
+        if len(pending) >= BULK_INSERT_CHUNK_SIZE:
+            await _flush()
+
+    if not report.total_rows:
+        raise HTTPException(status_code=400, detail="No hospitals provided")
+
+    if not report.is_valid:
+        await db.rollback()
+        raise HTTPException(
+            status_code=422,
+            detail=report.error_detail("Hospital validation failed"),
+        )
+
+    if pending:
+        await _flush()
+    await db.commit()
+    await cache.invalidate([hospital_key(item["id"]) for item in created])
+
+    return FastJSONResponse(
+        {
+            "created": len(created),
+            "hospitals": created,
+            "duplicates": sorted(duplicates),
+        },
+        status_code=201,
+    )
+
+
+@app.get("/hospitals", response_model=HospitalPage)
+async def list_hospitals(
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
+    after_id = 0
+    if cursor:
+        try:
+            after_id = int(decode_cursor(cursor)["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query = (
+        select(*HOSPITAL_COLUMNS)
+        .where(Hospital.id > after_id)
+        .order_by(Hospital.id)
+    )
+
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_hospitals_ndjson(
+                stream_pages(session_factory, query, Hospital.id)
+            ),
+            media_type="application/x-ndjson",
+        )
+
+    result = await db.execute(query.limit(limit + 1))
+    hospitals = hospital_dicts(result)
+
+    next_cursor = None
+    if len(hospitals) > limit:
+        hospitals = hospitals[:limit]
+        next_cursor = encode_cursor({"id": hospitals[-1]["id"]})
+
+    return FastJSONResponse({"hospitals": hospitals, "next_cursor": next_cursor})
+
+
+@app.get("/hospitals/batches", response_model=BatchSummaryPage)
+async def list_hospital_batches(
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[List[str]] = Query(None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    query = (
+        select(*BATCH_SUMMARY_COLUMNS)
+        .order_by(JobStatus.created_at.desc(), JobStatus.id.desc())
+    )
+
+    if status:
+        query = query.where(JobStatus.status.in_(status))
+    if created_after is not None:
+        query = query.where(JobStatus.created_at > created_after)
+    if created_before is not None:
+        query = query.where(JobStatus.created_at < created_before)
+
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            after = (
+                datetime.fromisoformat(position["created_at"]),
+                int(position["id"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        query = query.where(
+            tuple_(JobStatus.created_at, JobStatus.id) < tuple_(*after)
+        )
+
+    result = await db.execute(query.add_columns(JobStatus.id).limit(limit + 1))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            "created_at": last.created_at.isoformat(),
+            "id": last.id,
+        })
+
+    return FastJSONResponse({
+        "batches": batch_summary_dicts(rows),
+        "next_cursor": next_cursor,
+    })
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def export_response(
+    session_factory: sessionmaker,
+    query,
+    format: str,
+    gzip: bool,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Streams `query` (HOSPITAL_COLUMNS rows in id order) as a CSV or NDJSON
+    download, gzipped on the fly with Content-Encoding: gzip when asked to.
+    """
+    pages = stream_pages(session_factory, query, Hospital.id)
+    if format == "csv":
+        body = stream_hospitals_csv(pages)
+    else:
+        body = stream_hospitals_ndjson(pages)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{format}"',
+    }
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@app.get("/hospitals/export")
+async def export_hospitals(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
+    query = select(*HOSPITAL_COLUMNS).order_by(Hospital.id)
+    return export_response(session_factory, query, format, gzip, "hospitals")
+
+
+@app.get("/hospitals/search", response_model=HospitalSearchPage)
+async def search_hospitals(
+    q: str = Query(..., min_length=SEARCH_MIN_QUERY_LENGTH, max_length=255),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    pattern = escape_like(q) + "%"
+    name_prefix = Hospital.name.ilike(pattern, escape="\\")
+    address_prefix = Hospital.address.ilike(pattern, escape="\\")
+
+    # Prefix matches rank first, then by trigram similarity.
+    score = func.greatest(
+        case((or_(name_prefix, address_prefix), 1.0), else_=0.0),
+        func.similarity(Hospital.name, q),
+        func.similarity(Hospital.address, q),
+    )
+
+    query = (
+        select(Hospital, score.label("score"))
+        .where(
+            or_(
+                name_prefix,
+                address_prefix,
+                Hospital.name.op("%")(q),
+                Hospital.address.op("%")(q),
+            )
+        )
+        .order_by(score.desc(), Hospital.id.desc())
+    )
+
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            after = (float(position["score"]), int(position["id"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        query = query.where(tuple_(score, Hospital.id) < tuple_(*after))
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_hospital, last_score = rows[-1]
+        next_cursor = encode_cursor({"score": last_score, "id": last_hospital.id})
+
+    return {
+        "hospitals": [
+            {
+                **HospitalResponse.model_validate(hospital).model_dump(),
+                "score": row_score,
+            }
+            for hospital, row_score in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
 
 @app.get("/hospitals/{hospital_id}", response_model=HospitalResponse)
 async def get_hospital(
     hospital_id: int,
     db: AsyncSession = Depends(get_db),
 ):
+    cached = await cache.get(hospital_key(hospital_id))
+    if cached is not None:
+        return cached
+
     result = await db.execute(
         select(Hospital).where(Hospital.id == hospital_id)
     )
@@ -51,7 +500,10 @@ async def get_hospital(
     if hospital is None:
         raise HTTPException(status_code=404, detail="Hospital not found")
 
-    return hospital
+    response = HospitalResponse.model_validate(hospital).model_dump(mode="json")
+    await cache.set(hospital_key(hospital_id), response)
+
+    return response
 
 
 
@@ -60,6 +512,10 @@ async def get_hospital_batch(
     batch_id: str,
     db: AsyncSession = Depends(get_db),
 ):
+    cached = await cache.get(batch_key(batch_id))
+    if cached is not None:
+        return FastJSONResponse(cached)
+
     result = await db.execute(
         select(JobStatus).where(JobStatus.batch_id == batch_id)
     )
@@ -69,23 +525,124 @@ async def get_hospital_batch(
         raise HTTPException(status_code=404, detail="Batch not found")
 
     result = await db.execute(
-        select(Hospital).where(Hospital.creation_batch_id == batch_id)
+        select(*HOSPITAL_COLUMNS)
+        .where(Hospital.creation_batch_id == batch_id)
+        .order_by(Hospital.id)
     )
-    hospitals = result.scalars().all()
 
-    return {
+    response = {
         "batch_id": batch_id,
+        "status": job.status,
         "total_hospitals": job.total_hospitals,
         "processed_hospitals": job.processed_hospitals,
         "failed_hospitals": job.failed_hospitals,
+        "duplicate_hospitals": job.duplicate_hospitals,
         "processing_time_seconds": job.processing_time_seconds or 0.0,
-        "sys_custom_fields": job.sys_custom_fields,
-        "hospitals": hospitals,
+        "sys_custom_fields": dict(job.sys_custom_fields or {}),
+        "timings": job.timings or {},
+        "hospitals": hospital_dicts(result),
     }
 
+    # A running activation or deletion changes the hospitals chunk by
+    # chunk, so the batch is only cached once neither is in progress.
+    operations = (
+        response["sys_custom_fields"].get(key) or {}
+        for key in ("activation", "deletion")
+    )
+    if job.status in CACHEABLE_BATCH_STATUSES and not any(
+        operation.get("status") == "IN_PROGRESS" for operation in operations
+    ):
+        await cache.set(batch_key(batch_id), response)
+
+    return FastJSONResponse(response)
+
+
 
+@app.get("/hospitals/batch/{batch_id}/errors", response_model=BatchRowErrorPage)
+async def get_batch_errors(
+    batch_id: str,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    after_row = 0
+    if cursor:
+        try:
+            after_row = int(decode_cursor(cursor)["row"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    job_id = await db.scalar(
+        select(JobStatus.id).where(JobStatus.batch_id == batch_id)
+    )
+    if job_id is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
 
-@app.patch("/hospitals/batch/{batch_id}/activate")
+    result = await db.execute(
+        select(BatchRowError)
+        .where(
+            BatchRowError.batch_id == batch_id,
+            BatchRowError.row_number > after_row,
+        )
+        .order_by(BatchRowError.row_number)
+        .limit(limit + 1)
+    )
+    errors = result.scalars().all()
+
+    next_cursor = None
+    if len(errors) > limit:
+        errors = errors[:limit]
+        next_cursor = encode_cursor({"row": errors[-1].row_number})
+
+    return {"batch_id": batch_id, "errors": errors, "next_cursor": next_cursor}
+
+
+
+@app.get("/hospitals/batch/{batch_id}/events")
+async def stream_hospital_batch_events(
+    batch_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    job_id = await db.scalar(
+        select(JobStatus.id).where(JobStatus.batch_id == batch_id)
+    )
+    if job_id is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return StreamingResponse(
+        batch_event_stream(db, batch_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/hospitals/batch/{batch_id}/export")
+async def export_hospital_batch(
+    batch_id: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
+    job_id = await db.scalar(
+        select(JobStatus.id).where(JobStatus.batch_id == batch_id)
+    )
+    # Not held open while the export streams.
+    await db.close()
+    if job_id is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    query = (
+        select(*HOSPITAL_COLUMNS)
+        .where(Hospital.creation_batch_id == batch_id)
+        .order_by(Hospital.id)
+    )
+    return export_response(
+        session_factory, query, format, gzip, f"batch-{batch_id}"
+    )
+
+
+@app.patch("/hospitals/batch/{batch_id}/activate", status_code=202)
 async def activate_batch(
     batch_id: str,
     db: AsyncSession = Depends(get_db),
@@ -108,7 +665,14 @@ async def activate_batch(
             detail="Batch already activated"
         )
 
+    if job.status == "DELETING":
+        raise HTTPException(status_code=409, detail="Batch is being deleted")
+
     sys_custom_fields["batch_activated"] = True
+    sys_custom_fields["activation"] = {
+        "status": "IN_PROGRESS",
+        "activated_hospitals": 0,
+    }
 
     await db.execute(
         update(JobStatus)
@@ -117,14 +681,19 @@ async def activate_batch(
         .execution_options(synchronize_session=False)
     )
 
-    await db.execute(
-        update(Hospital)
-        .where(Hospital.creation_batch_id == batch_id)
-        .values(is_active=True)
-        .execution_options(synchronize_session=False)
-    )
-
     await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
+
+    try:
+        await jobs.submit("activate_batch", batch_id)
+    except Exception:
+        logger.exception("Could not submit the activation of %s", batch_id)
+        # Clears batch_activated again, so the PATCH can be retried.
+        await fail_batch_activation(db, batch_id, "Activation not started")
+        raise HTTPException(
+            status_code=503,
+            detail="Could not start the activation, try again later"
+        )
 
     return {
         "batch_id": batch_id,
@@ -133,90 +702,169 @@ async def activate_batch(
         "failed_hospitals": job.failed_hospitals,
         "processing_time_seconds": job.processing_time_seconds or 0.0,
         "batch_activated": sys_custom_fields["batch_activated"],
+        "activation": sys_custom_fields["activation"],
     }
 
 
 
 
 
-@app.delete("/hospitals/batch/{batch_id}", status_code=204)
+@app.delete("/hospitals/batch/{batch_id}", status_code=202)
 async def delete_batch( batch_id: str, db: AsyncSession = Depends(get_db),):
 
     result = await db.execute(
-        select(JobStatus).where(JobStatus.batch_id == batch_id)
+        select(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .with_for_update()
     )
     job = result.scalar_one_or_none()
 
     if job is None:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    await db.execute(
-        delete(Hospital).where(Hospital.creation_batch_id == batch_id)
-    )
-
-    await db.delete(job)
+    if job.status == "IN_PROGRESS":
+        raise HTTPException(
+            status_code=409,
+            detail="Batch is still being imported"
+        )
 
+    # Submitted again on every DELETE, so a deletion that was lost or ran
+    # out of retries resumes; delete_batch_rows picks up where it stopped.
+    job.status = "DELETING"
     await db.commit()
+    await cache.invalidate([batch_key(batch_id)])
+
+    try:
+        await jobs.submit("delete_batch", batch_id)
+    except Exception:
+        logger.exception("Could not submit the deletion of %s", batch_id)
+        await fail_batch_deletion(db, batch_id, "Deletion not started")
+        raise HTTPException(
+            status_code=503,
+            detail="Could not start the deletion, try again later"
+        )
+
+    return {
+        "batch_id": batch_id,
+        "status": "DELETING",
+        "message": "Batch deletion started. Use batch_id to track progress."
+    }
 
 
 
+# Batches an identical upload is answered with instead of a new import;
+# failed batches and batches being deleted do not count.
+DEDUP_BATCH_STATUSES = (
+    "PENDING",
+    "IN_PROGRESS",
+    "COMPLETED",
+    "COMPLETED_WITH_ERRORS",
+)
+
+
 @app.post("/hospitals/bulk", status_code=201)
 async def create_hospitals_bulk(
+    response: Response,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
 ):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(
-            status_code=400,
-            detail="Only CSV files are allowed"
+    compression = _upload_compression(file.filename)
+
+    try:
+        upload = await spool_upload(file, compression)
+    except (CompressionError, DecompressedSizeExceeded) as err:
+        raise _decompression_error(err)
+
+    try:
+        if not upload.size:
+            raise HTTPException(
+                status_code=400,
+                detail="Uploaded CSV file is empty"
+            )
+
+        # Validated before any transaction is opened, so no connection is
+        # held (nor lock taken) while the pool works through the file.
+        report = await offload.run_cpu_bound(
+            validate_csv_file, str(spool_path(upload.ref))
         )
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(
-            status_code=400,
-            detail="Uploaded CSV file is empty"
+        if not report.is_valid:
+            raise HTTPException(
+                status_code=400,
+                detail=report.error_detail(),
+            )
+
+        if report.total_rows > BULK_MAX_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Max {BULK_MAX_ROWS} hospitals allowed"
+            )
+
+        if BULK_DEDUP_WINDOW_SECONDS > 0:
+            # Serialises identical uploads until this transaction commits,
+            # so concurrent retries cannot both enqueue the same file.
+            await db.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(upload.sha256)))
+            )
+            result = await db.execute(
+                select(
+                    JobStatus.batch_id,
+                    JobStatus.status,
+                    JobStatus.total_hospitals,
+                )
+                .where(
+                    JobStatus.content_sha256 == upload.sha256,
+                    JobStatus.status.in_(DEDUP_BATCH_STATUSES),
+                    JobStatus.created_at >= func.now() - timedelta(
+                        seconds=BULK_DEDUP_WINDOW_SECONDS
+                    ),
+                )
+                .order_by(JobStatus.created_at.desc())
+                .limit(1)
+            )
+            existing = result.first()
+
+            if existing is not None:
+                await db.rollback()
+                remove_spooled(upload.ref)
+                response.status_code = 200
+                return {
+                    "batch_id": existing.batch_id,
+                    "status": existing.status,
+                    "total_hospitals": existing.total_hospitals,
+                    "duplicate": True,
+                    "message": "Identical file already uploaded. Use batch_id to track progress."
+                }
+
+        batch_id = str(uuid4())
+        job = JobStatus(
+            batch_id=batch_id,
+            total_hospitals=report.total_rows,
+            processed_hospitals=0,
+            failed_hospitals=0,
+            status="IN_PROGRESS",
+            content_sha256=upload.sha256,
+            upload_ref=upload.ref,
+            sys_custom_fields={},
         )
 
-    csv_text = content.decode("utf-8")
+        db.add(job)
+        await store_upload(db, batch_id, upload.ref)
+        await db.commit()
 
-    rows, errors = validate_csv_text(csv_text)
+        await jobs.submit("bulk_import", batch_id, upload.ref)
+    except BaseException:
+        remove_spooled(upload.ref)
+        raise
 
-    if errors:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "message": "CSV validation failed",
-                "errors": errors,
-            }
-        )
-
-    if len(rows) > 20:
-        raise HTTPException(
-            status_code=400,
-            detail="Max 20 hospitals allowed"
-        )
-
-    batch_id = str(uuid4())
-    job = JobStatus(
-        batch_id=batch_id,
-        total_hospitals=len(rows),
-        processed_hospitals=0,
-        failed_hospitals=0,
-        status="IN_PROGRESS",
-        sys_custom_fields={},
-    )
-
-    db.add(job)
-    await db.commit()
-
-    from worker.tasks import process_bulk_hospitals
-    process_bulk_hospitals.delay(batch_id, csv_text)
+    if UPLOAD_STORE == "database":
+        # Workers read their copy from upload_parts.
+        remove_spooled(upload.ref)
 
     return {
         "batch_id": batch_id,
         "status": "IN_PROGRESS",
-        "total_hospitals": len(rows),
+        "total_hospitals": report.total_rows,
         "message": "Bulk processing started. Use batch_id to track progress."
     }
 
@@ -226,39 +874,54 @@ async def create_hospitals_bulk(
 async def validate_hospital_csv(
     file: UploadFile = File(...)
 ):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(
-            status_code=400,
-            detail="Only CSV files are allowed"
-        )
-
-    content = await file.read()
-    if not content:
-        raise HTTPException(
-            status_code=400,
-            detail="Uploaded CSV file is empty"
+    compression = _upload_compression(file.filename)
+
+    # Spooled to disk so the validation can run in the offload pool.
+    try:
+        upload = await spool_upload(file, compression)
+    except (CompressionError, DecompressedSizeExceeded) as err:
+        raise _decompression_error(err)
+
+    try:
+        if not upload.size:
+            raise HTTPException(
+                status_code=400,
+                detail="Uploaded CSV file is empty"
+            )
+
+        report = await offload.run_cpu_bound(
+            validate_csv_file, str(spool_path(upload.ref))
         )
+    finally:
+        remove_spooled(upload.ref)
 
-    csv_text = content.decode("utf-8")
-
-    rows, errors = validate_csv_text(csv_text)
-
-    if len(rows) > 20:
+    if report.total_rows > BULK_MAX_ROWS:
         raise HTTPException(
             status_code=400,
-            detail="Max 20 hospitals allowed"
+            detail=f"Max {BULK_MAX_ROWS} hospitals allowed"
         )
 
-    if errors:
+    if not report.is_valid:
         raise HTTPException(
             status_code=400,
-            detail={
-                "message": "CSV validation failed",
-                "errors": errors,
-            }
+            detail=report.error_detail(),
         )
 
     return {
         "message": "CSV is valid",
-        "total_rows": len(rows),
-    }
\ No newline at end of file
+        "total_rows": report.total_rows,
+    }
+
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return cache.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(
+        content=metrics.render(),
+        media_type=metrics.CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,211 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Imported before prometheus_client, which picks multiprocess mode from
+# PROMETHEUS_MULTIPROC_DIR (possibly set by .env) when it is imported.
+from .const import PROMETHEUS_MULTIPROC_DIR
+
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+else:
+    # Set but empty still switches prometheus_client to multiprocess mode.
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+http_request_duration = Histogram(
+    "hms_http_request_duration_seconds",
+    "HTTP request latency by route, until the response body is sent.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+http_request_queries = Histogram(
+    "hms_http_request_db_queries",
+    "Number of SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_queries = Counter(
+    "hms_db_queries_total",
+    "SQL statements executed, by route (or 'background').",
+    ("route",),
+)
+db_query_duration = Histogram(
+    "hms_db_query_duration_seconds",
+    "SQL statement execution time, by route (or 'background').",
+    ("route",),
+    buckets=LATENCY_BUCKETS,
+)
+task_duration = Histogram(
+    "hms_worker_task_duration_seconds",
+    "Background task run time by task name and final state.",
+    ("task", "state"),
+    buckets=TASK_BUCKETS,
+)
+offload_queue_depth = Gauge(
+    "hms_offload_queue_depth",
+    "CPU-bound jobs waiting for a free offload worker.",
+    multiprocess_mode="livesum",
+)
+offload_in_flight = Gauge(
+    "hms_offload_in_flight",
+    "CPU-bound jobs running in the offload pool.",
+    multiprocess_mode="livesum",
+)
+offload_duration = Histogram(
+    "hms_offload_duration_seconds",
+    "Run time of CPU-bound jobs in the offload pool, excluding queueing.",
+    ("task",),
+    buckets=TASK_BUCKETS,
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "query_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "hms_request_stats", default=None
+)
+
+
+def route_label(scope: dict) -> str:
+    """
+    The matched route template, so /hospitals/{hospital_id} is one series
+    rather than one per id.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request until the last byte of the
+    body is sent, so streamed responses are measured in full, and counting
+    the SQL statements it executed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _request_stats.reset(token)
+            route = route_label(scope)
+            http_request_duration.labels(
+                scope["method"], route, status
+            ).observe(time.perf_counter() - start)
+            http_request_queries.labels(scope["method"], route).observe(
+                stats.queries
+            )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("hms_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("hms_query_start")
+    if not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _request_stats.get()
+    route = stats.route if stats is not None else "background"
+
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+    db_queries.labels(route).inc()
+    db_query_duration.labels(route).observe(elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    conn = context.connection
+    starts = conn.info.get("hms_query_start") if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+def record_task(task: str, state: str, seconds: float) -> None:
+    """
+    Records a background task run, whether it ran in a Celery worker or
+    in the API's in-process job backend.
+    """
+    task_duration.labels(task, state).observe(seconds)
+
+
+def registry() -> CollectorRegistry:
+    """
+    The registry to expose: in multiprocess mode, one collecting the
+    metrics of every process writing to PROMETHEUS_MULTIPROC_DIR.
+    """
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def render() -> bytes:
+    return generate_latest(registry())
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Drops an exiting process's live gauges from the multiprocess totals.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,96 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from . import metrics
+from .const import CSV_OFFLOAD_MODE, CSV_OFFLOAD_WORKERS
+
+T = TypeVar("T")
+
+
+class Offloader:
+    """
+    Runs CPU-bound functions (CSV parsing and validation) in a process or
+    thread pool so they never block the event loop. At most `workers`
+    jobs run at once; callers beyond that wait on a semaphore, counted by
+    the hms_offload_queue_depth gauge, rather than piling up inside the
+    executor.
+
+    In "process" mode the function and its arguments must be picklable,
+    so pass file paths rather than open files.
+    """
+
+    def __init__(self, mode: str, workers: int):
+        if mode not in ("process", "thread"):
+            raise ValueError(
+                f"Unknown CSV_OFFLOAD_MODE {mode!r}, expected 'process' or 'thread'"
+            )
+        self.mode = mode
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn: forking a process with a running event loop and
+                # open DB/Redis connections is not safe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="hms-offload",
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.workers)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        semaphore = self._get_semaphore()
+        task = getattr(func, "__name__", "job")
+
+        metrics.offload_queue_depth.inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            metrics.offload_queue_depth.dec()
+
+        metrics.offload_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            metrics.offload_duration.labels(task).observe(
+                time.perf_counter() - started
+            )
+            metrics.offload_in_flight.dec()
+            semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+offloader = Offloader(CSV_OFFLOAD_MODE, CSV_OFFLOAD_WORKERS)
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any) -> T:
+    return await offloader.run(func, *args)
+
+
+def shutdown() -> None:
+    offloader.shutdown()
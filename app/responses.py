@@ -0,0 +1,38 @@
+from typing import Any, Iterable, List
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import Row
+
+from models import Hospital, JobStatus
+from .serializers import BatchSummary, HospitalResponse
+from .utils import dumps_json
+
+# Columns of HospitalResponse, selected as plain rows so large pages skip
+# ORM object construction and identity-map bookkeeping.
+HOSPITAL_FIELDS = tuple(HospitalResponse.model_fields)
+HOSPITAL_COLUMNS = tuple(getattr(Hospital, field) for field in HOSPITAL_FIELDS)
+
+
+def hospital_dicts(rows: Iterable[Row]) -> List[dict]:
+    return [dict(zip(HOSPITAL_FIELDS, row)) for row in rows]
+
+
+# Counters of BatchSummary; the batch index never loads the JSONB columns.
+BATCH_SUMMARY_FIELDS = tuple(BatchSummary.model_fields)
+BATCH_SUMMARY_COLUMNS = tuple(
+    getattr(JobStatus, field) for field in BATCH_SUMMARY_FIELDS
+)
+
+
+def batch_summary_dicts(rows: Iterable[Row]) -> List[dict]:
+    return [dict(zip(BATCH_SUMMARY_FIELDS, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Endpoints return it directly, which
+    also skips FastAPI's response_model validation and jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
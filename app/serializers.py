@@ -1,5 +1,5 @@
 from pydantic import BaseModel,ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -23,3 +23,47 @@ class HospitalResponse(BaseModel):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class HospitalPage(BaseModel):
+    hospitals: List[HospitalResponse]
+    next_cursor: Optional[str] = None
+
+
+class BatchRowErrorResponse(BaseModel):
+    row_number: int
+    hospital_key: Optional[str] = None
+    error: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BatchRowErrorPage(BaseModel):
+    batch_id: str
+    errors: List[BatchRowErrorResponse]
+    next_cursor: Optional[str] = None
+
+
+class BatchSummary(BaseModel):
+    batch_id: str
+    status: Optional[str] = None
+    total_hospitals: int
+    processed_hospitals: Optional[int] = None
+    failed_hospitals: Optional[int] = None
+    duplicate_hospitals: int
+    processing_time_seconds: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+
+class BatchSummaryPage(BaseModel):
+    batches: List[BatchSummary]
+    next_cursor: Optional[str] = None
+
+
+class HospitalSearchResult(HospitalResponse):
+    score: float
+
+
+class HospitalSearchPage(BaseModel):
+    hospitals: List[HospitalSearchResult]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional, TextIO
+from uuid import uuid4
+
+from fastapi import UploadFile
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from models import UploadPart
+from .compression import open_decompressed
+from .const import UPLOAD_SPOOL_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_STORE
+
+
+@dataclass
+class SpooledUpload:
+    ref: str
+    size: int
+    sha256: str
+
+
+def spool_path(upload_ref: str) -> Path:
+    """
+    Resolves an upload reference to its file in the spool directory.
+    References are bare file names, anything else is rejected.
+    """
+    if not upload_ref or os.path.basename(upload_ref) != upload_ref:
+        raise ValueError(f"Invalid upload reference: {upload_ref!r}")
+
+    return Path(UPLOAD_SPOOL_DIR) / upload_ref
+
+
+def _spool(
+    raw: BinaryIO,
+    compression: Optional[str],
+    out: BinaryIO,
+    digest,
+) -> int:
+    stream = raw if compression is None else open_decompressed(raw, compression)
+    size = 0
+
+    while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+        out.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+
+    return size
+
+
+async def spool_upload(
+    file: UploadFile,
+    compression: Optional[str] = None,
+) -> SpooledUpload:
+    """
+    Streams an uploaded file to the spool directory in UPLOAD_CHUNK_SIZE
+    pieces, so only one chunk is held in memory at a time. The SHA-256
+    of the content is computed on the way through. The copy runs in a
+    worker thread, keeping file I/O and hashing off the event loop.
+
+    Compressed uploads ("gzip" or "zstd") are decompressed on the way, so
+    the spooled file, its size and its SHA-256 are always those of the
+    plain CSV.
+    """
+    Path(UPLOAD_SPOOL_DIR).mkdir(parents=True, exist_ok=True)
+
+    upload_ref = f"{uuid4()}.csv"
+    path = spool_path(upload_ref)
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, "wb") as out:
+            await file.seek(0)
+            size = await run_in_threadpool(
+                _spool, file.file, compression, out, digest
+            )
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return SpooledUpload(
+        ref=upload_ref,
+        size=size,
+        sha256=digest.hexdigest(),
+    )
+
+
+def open_spooled(upload_ref: str) -> TextIO:
+    return open(spool_path(upload_ref), newline="", encoding="utf-8")
+
+
+def remove_spooled(upload_ref: str) -> None:
+    spool_path(upload_ref).unlink(missing_ok=True)
+
+
+async def store_upload(db: AsyncSession, batch_id: str, upload_ref: str) -> None:
+    """
+    With UPLOAD_STORE=database, copies the spooled upload into upload_parts
+    in UPLOAD_CHUNK_SIZE pieces, inside the caller's transaction, so it is
+    committed together with the batch and workers on other hosts can read
+    it. Does nothing with the shared local spool.
+    """
+    if UPLOAD_STORE != "database":
+        return
+
+    with open(spool_path(upload_ref), "rb") as upload:
+        part = 0
+        while data := await asyncio.to_thread(upload.read, UPLOAD_CHUNK_SIZE):
+            await db.execute(
+                insert(UploadPart).values(batch_id=batch_id, part=part, data=data)
+            )
+            part += 1
+
+
+@asynccontextmanager
+async def local_upload(
+    db: AsyncSession, batch_id: str, upload_ref: str
+) -> AsyncIterator[Path]:
+    """
+    Path of a readable copy of the upload for the duration of the block:
+    the spooled file when this host has it, otherwise (UPLOAD_STORE=database)
+    a temporary file fetched from upload_parts and removed afterwards.
+    Raises FileNotFoundError if the upload is in neither place.
+    """
+    path = spool_path(upload_ref)
+    if UPLOAD_STORE != "database" or path.exists():
+        if not path.exists():
+            raise FileNotFoundError(path)
+        yield path
+        return
+
+    Path(UPLOAD_SPOOL_DIR).mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=UPLOAD_SPOOL_DIR, suffix=".part", delete=False
+    ) as out:
+        fetched = Path(out.name)
+
+    try:
+        with open(fetched, "wb") as out:
+            found = False
+            result = await db.stream(
+                select(UploadPart.data)
+                .where(UploadPart.batch_id == batch_id)
+                .order_by(UploadPart.part)
+            )
+            async for data in result.scalars():
+                await asyncio.to_thread(out.write, data)
+                found = True
+
+        if not found:
+            raise FileNotFoundError(path)
+        yield fetched
+    finally:
+        fetched.unlink(missing_ok=True)
+
+
+async def discard_upload(
+    db: AsyncSession, batch_id: str, upload_ref: Optional[str] = None
+) -> None:
+    """
+    Drops the upload once the batch no longer needs it: the spooled file
+    on this host and, in the caller's transaction, its upload_parts.
+    """
+    if upload_ref is not None:
+        remove_spooled(upload_ref)
+
+    await db.execute(delete(UploadPart).where(UploadPart.batch_id == batch_id))
@@ -0,0 +1,113 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row, Select
+from sqlalchemy.orm import InstrumentedAttribute, sessionmaker
+
+from .const import STREAM_FETCH_SIZE, EXPORT_GZIP_LEVEL
+from .responses import HOSPITAL_FIELDS
+from .utils import dumps_json
+
+
+async def stream_pages(
+    session_factory: sessionmaker,
+    query: Select,
+    key: InstrumentedAttribute,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Yields the rows of `query`, which is ordered by the unique column
+    `key`, STREAM_FETCH_SIZE rows at a time, so memory stays flat however
+    many rows there are. Pages are keyset-paginated on `key` and each is
+    read in its own short session, so no connection or transaction is
+    held while the client reads.
+    """
+    last = None
+
+    while True:
+        page = query if last is None else query.where(key > last)
+        async with session_factory() as db:
+            result = await db.execute(page.limit(STREAM_FETCH_SIZE))
+            rows = result.all()
+
+        if rows:
+            yield rows
+        if len(rows) < STREAM_FETCH_SIZE:
+            return
+        last = getattr(rows[-1], key.key)
+
+
+async def stream_hospitals_ndjson(
+    pages: AsyncIterator[Sequence[Row]],
+) -> AsyncIterator[bytes]:
+    """
+    Streams hospitals as NDJSON, one block per page of HOSPITAL_COLUMNS
+    rows.
+    """
+    async for page in pages:
+        yield b"".join(
+            dumps_json(dict(zip(HOSPITAL_FIELDS, row))) + b"\n"
+            for row in page
+        )
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def stream_hospitals_csv(
+    pages: AsyncIterator[Sequence[Row]],
+) -> AsyncIterator[bytes]:
+    """
+    Streams hospitals as CSV with a header row, one block per page of
+    HOSPITAL_COLUMNS rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(HOSPITAL_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+
+    async for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [_csv_value(value) for value in row] for row in page
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Gzips a byte stream incrementally, flushing once per input block so
+    the client keeps receiving data while the export runs.
+    """
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Splits a streamed request body into its non-blank NDJSON lines as
+    they arrive.
+    """
+    buffer = b""
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+
+    if buffer.strip():
+        yield buffer
@@ -1,53 +1,192 @@
+import base64
 import csv
+import hashlib
 import io
-from typing import List, Tuple
-from .const import REQUIRED_COLUMNS, ALLOWED_COLUMNS
+import json
+import re
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Tuple
+import orjson
+from .const import (
+    REQUIRED_COLUMNS,
+    ALLOWED_COLUMNS,
+    COLUMN_MAX_LENGTHS,
+    CSV_MAX_REPORTED_ERRORS,
+)
 
 
-def validate_csv_text(csv_text: str) -> Tuple[List[dict], List[str]]:
+@dataclass
+class CsvValidationReport:
     """
-    Validates CSV content and returns:
-    - rows: parsed CSV rows
-    - errors: list of validation errors
+    Outcome of a streaming CSV validation. Only the first `max_errors`
+    messages are kept; every error is still counted per type.
     """
+    total_rows: int = 0
+    errors: List[str] = field(default_factory=list)
+    error_counts: Dict[str, int] = field(default_factory=dict)
+    max_errors: int = CSV_MAX_REPORTED_ERRORS
+
+    def add_error(self, error_type: str, message: str) -> None:
+        self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(message)
+
+    @property
+    def total_errors(self) -> int:
+        return sum(self.error_counts.values())
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.error_counts
+
+    def error_detail(self, message: str = "CSV validation failed") -> dict:
+        return {
+            "message": message,
+            "errors": self.errors,
+            "error_counts": self.error_counts,
+            "total_errors": self.total_errors,
+        }
+
+
+def check_row(row: dict) -> List[Tuple[str, str]]:
+    """
+    Returns (error_type, message) for every problem in a CSV data row.
+    Shared by the upload validators and the ingestion worker.
+    """
+    problems: List[Tuple[str, str]] = []
+
+    for column in ("name", "address"):
+        if not row.get(column):
+            problems.append((f"missing_{column}", f"'{column}' is required"))
+
+    for column, max_length in COLUMN_MAX_LENGTHS.items():
+        value = row.get(column)
+        if isinstance(value, str) and len(value) > max_length:
+            problems.append((
+                "too_long",
+                f"'{column}' exceeds {max_length} characters",
+            ))
+
+    return problems
+
+
+def validate_csv_stream(
+    stream: BinaryIO,
+    max_errors: int = CSV_MAX_REPORTED_ERRORS,
+) -> CsvValidationReport:
+    """
+    Validates CSV content from a binary stream in a single pass. Rows are
+    checked and discarded as they are read, so memory stays constant
+    regardless of file size.
+    """
+    report = CsvValidationReport(max_errors=max_errors)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
 
     try:
-        reader = csv.DictReader(io.StringIO(csv_text))
-    except Exception:
-        return [], ["Invalid CSV format"]
+        reader = csv.DictReader(text)
+        headers = set(reader.fieldnames or [])
+
+        missing_columns = REQUIRED_COLUMNS - headers
+        extra_columns = headers - ALLOWED_COLUMNS
 
-    headers = set(reader.fieldnames or [])
-    errors: List[str] = []
+        if missing_columns:
+            report.add_error(
+                "missing_columns",
+                f"Missing required columns: {', '.join(sorted(missing_columns))}",
+            )
 
-    missing_columns = REQUIRED_COLUMNS - headers
-    extra_columns = headers - ALLOWED_COLUMNS
+        if extra_columns:
+            report.add_error(
+                "unexpected_columns",
+                f"Unexpected columns found: {', '.join(sorted(extra_columns))}",
+            )
 
-    if missing_columns:
-        errors.append(
-            f"Missing required columns: {', '.join(missing_columns)}"
-        )
+        for index, row in enumerate(reader, start=1):
+            if not any(row.values()):
+                report.add_error("empty_row", f"Row {index}: Empty row")
+                continue
 
-    if extra_columns:
-        errors.append(
-            f"Unexpected columns found: {', '.join(extra_columns)}"
-        )
+            for error_type, message in check_row(row):
+                report.add_error(error_type, f"Row {index}: {message}")
 
-    rows = []
+            report.total_rows += 1
+    except UnicodeDecodeError:
+        report.add_error("encoding", "CSV file is not valid UTF-8")
+    except csv.Error as err:
+        report.add_error("invalid_csv", f"Invalid CSV format: {err}")
+    finally:
+        text.detach()
 
-    for index, row in enumerate(reader, start=1):
-        if not any(row.values()):
-            errors.append(f"Row {index}: Empty row")
-            continue
+    if not report.total_rows:
+        report.add_error("no_rows", "CSV contains no valid data rows")
 
-        if not row.get("name"):
-            errors.append(f"Row {index}: 'name' is required")
+    return report
 
-        if not row.get("address"):
-            errors.append(f"Row {index}: 'address' is required")
 
-        rows.append(row)
+def validate_csv_file(
+    path: str,
+    max_errors: int = CSV_MAX_REPORTED_ERRORS,
+) -> CsvValidationReport:
+    with open(path, "rb") as stream:
+        return validate_csv_stream(stream, max_errors=max_errors)
+
+
+def dumps_json(content) -> bytes:
+    """
+    orjson with UTC datetimes rendered as "...Z", the same as pydantic.
+    """
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z, default=str)
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encodes a keyset position into an opaque, URL-safe cursor.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decodes a cursor produced by encode_cursor. Raises ValueError on
+    malformed input.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as err:
+        raise ValueError("Invalid cursor") from err
+
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+
+    return position
+
+
+def escape_like(value: str) -> str:
+    """
+    Escapes LIKE/ILIKE wildcards so user input is matched literally.
+    """
+    return (
+        value.replace("\\", "\\\\")
+        .replace("%", "\\%")
+        .replace("_", "\\_")
+    )
+
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_text(value: str) -> str:
+    """
+    Folds case, whitespace and punctuation: lower-cases the text and
+    collapses every run of non-alphanumeric characters (in any script)
+    into one space. Existing rows were re-keyed with this function by
+    migration a4c9e1b7d3f5.
+    """
+    return _NON_ALNUM.sub(" ", value.lower()).strip()
 
-    if not rows:
-        errors.append("CSV contains no valid data rows")
 
-    return rows, errors
+def hospital_dedup_key(name: str, address: str) -> str:
+    normalized = f"{normalize_text(name)}|{normalize_text(address)}"
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()
@@ -1,2 +1,5 @@
 from .hospital import Hospital
 from .jobstatus import JobStatus
+from .batch_row_error import BatchRowError
+from .import_chunk import ImportChunk
+from .upload_part import UploadPart
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class BatchRowError(Base):
+    __tablename__ = "batch_row_errors"
+
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(
+        String(36),
+        ForeignKey("job_status.batch_id"),
+        nullable=False,
+    )
+    row_number = Column(Integer, nullable=False)
+    hospital_key = Column(Text, nullable=True)
+    error = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_batch_row_errors_batch_id_row_number",
+            "batch_id",
+            "row_number",
+        ),
+    )
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
+from app.utils import hospital_dedup_key
+
+
+def _default_dedup_key(context):
+    params = context.get_current_parameters()
+    return hospital_dedup_key(params["name"], params["address"])
 
 
 class Hospital(Base):
@@ -16,5 +22,26 @@ class Hospital(Base):
         nullable=True,
     )
     is_active = Column(Boolean, default=False)
+    # md5 of the normalized name and address, see app.utils.hospital_dedup_key.
+    dedup_key = Column(String(32), nullable=True, default=_default_dedup_key)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Serves batch lookups and id-ordered chunking within a batch.
+        Index("ix_hospitals_creation_batch_id_id", "creation_batch_id", "id"),
+        Index("ux_hospitals_dedup_key", "dedup_key", unique=True),
+        # Trigram indexes (pg_trgm) serving prefix/fuzzy search on name and address.
+        Index(
+            "ix_hospitals_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_hospitals_address_trgm",
+            "address",
+            postgresql_using="gin",
+            postgresql_ops={"address": "gin_trgm_ops"},
+        ),
+    )
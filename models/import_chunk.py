@@ -0,0 +1,43 @@
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ImportChunk(Base):
+    __tablename__ = "import_chunks"
+
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(
+        String(36),
+        ForeignKey("job_status.batch_id"),
+        nullable=False,
+    )
+    start_row = Column(Integer, nullable=False)
+    end_row = Column(Integer, nullable=False)
+    # Last CSV row whose hospitals and counters are committed.
+    checkpoint_row = Column(Integer, nullable=False)
+    # Byte offset in the spooled CSV where the row after checkpoint_row
+    # starts; NULL for chunks planned before it was recorded.
+    checkpoint_offset = Column(BigInteger, nullable=True)
+    status = Column(String(50), nullable=False, default="PENDING")
+    # app.ingestion.StageTimings of the committed part of the range.
+    timings = Column(
+        JSONB,
+        nullable=False,
+        default=dict,
+        server_default=text("'{}'::jsonb"),
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "batch_id",
+            "start_row",
+            name="uq_import_chunks_batch_id_start_row",
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, text, Float
+from sqlalchemy import Column, Integer, String, DateTime, text, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
@@ -14,13 +14,29 @@ class JobStatus(Base):
     total_hospitals = Column(Integer, nullable=False)
     processed_hospitals = Column(Integer, default=0)
     failed_hospitals = Column(Integer, default=0)
+    duplicate_hospitals = Column(Integer, nullable=False, default=0, server_default=text("0"))
     status = Column(String(50), default="IN_PROGRESS")
     processing_time_seconds = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # When a worker first picked the import up; created_at until then.
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    # Spooled upload of a bulk import, so an interrupted import can be
+    # submitted again.
+    upload_ref = Column(String(64), nullable=True)
     sys_custom_fields = Column( MutableDict.as_mutable(JSONB), nullable=False, default=dict,server_default=text("'{}'::jsonb"))
+    # Per-stage durations, throughput and peak batch sizes of the import,
+    # aggregated from import_chunks.timings by the finalizer.
+    timings = Column(JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb"))
     hospitals = relationship(
                 "Hospital",
                 primaryjoin="JobStatus.batch_id == Hospital.creation_batch_id",
                 viewonly=True,
             )
 
+    __table_args__ = (
+        # Serve the batch index (GET /hospitals/batches), newest first,
+        # with and without a status filter.
+        Index("ix_job_status_status_created_at", "status", "created_at"),
+        Index("ix_job_status_created_at_id", "created_at", "id"),
+    )
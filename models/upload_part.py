@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey
+from app.database import Base
+
+
+class UploadPart(Base):
+    """
+    A spooled upload copied into the database in UPLOAD_CHUNK_SIZE parts,
+    for workers that cannot read the API's spool directory
+    (UPLOAD_STORE=database).
+    """
+    __tablename__ = "upload_parts"
+
+    batch_id = Column(
+        String(36),
+        ForeignKey("job_status.batch_id"),
+        primary_key=True,
+    )
+    part = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
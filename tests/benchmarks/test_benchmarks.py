@@ -0,0 +1,251 @@
+"""
+Throughput and latency benchmarks against the test database.
+
+Skipped unless HMS_BENCHMARK=1. Tunables (environment):
+
+- HMS_BENCH_SIZES: hospital table sizes to seed (default 10000,100000,1000000)
+- HMS_BENCH_REQUESTS: requests per read endpoint (default 200)
+- HMS_BENCH_BATCHES: batches activated/deleted per size (default 10)
+- HMS_BENCH_BATCH_SIZE: hospitals per batch (default 1000)
+- HMS_BENCH_INGEST_ROWS: CSV rows imported at each size (default 20000)
+- HMS_BENCH_OUTPUT: JSON results file (default bench_results.json)
+"""
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select, text
+
+from app.batch_ops import activate_batch_hospitals, delete_batch_rows
+from app.cache import cache
+from app.ingestion import finalize_import, import_chunk, plan_import_chunks
+from app.utils import encode_cursor
+from models import JobStatus
+from tests.utils import get_client
+
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("HMS_BENCHMARK") != "1",
+    reason="set HMS_BENCHMARK=1 to run benchmarks",
+)
+
+SIZES = [
+    int(size)
+    for size in os.getenv("HMS_BENCH_SIZES", "10000,100000,1000000").split(",")
+]
+REQUESTS = int(os.getenv("HMS_BENCH_REQUESTS", "200"))
+BATCHES = int(os.getenv("HMS_BENCH_BATCHES", "10"))
+BATCH_SIZE = int(os.getenv("HMS_BENCH_BATCH_SIZE", "1000"))
+INGEST_ROWS = int(os.getenv("HMS_BENCH_INGEST_ROWS", "20000"))
+OUTPUT = os.getenv("HMS_BENCH_OUTPUT", "bench_results.json")
+
+
+@pytest.fixture(scope="module")
+def results():
+    data = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": REQUESTS,
+            "batches": BATCHES,
+            "batch_size": BATCH_SIZE,
+        },
+        "sizes": {},
+    }
+
+    yield data
+
+    with open(OUTPUT, "w") as out:
+        json.dump(data, out, indent=2, sort_keys=True)
+
+
+def summarize(samples):
+    """
+    p50/p99/max of a list of durations in seconds, reported in ms.
+    """
+    ordered = sorted(samples)
+
+    def _pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": _pct(0.50),
+        "p99_ms": _pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def seed(engine, size):
+    """
+    Resets the tables and inserts `size` hospitals, BATCHES * BATCH_SIZE of
+    them spread over completed batches, with one set-based INSERT.
+    """
+    batch_rows = min(BATCHES * BATCH_SIZE, size)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "TRUNCATE hospitals, batch_row_errors, import_chunks, job_status "
+            "RESTART IDENTITY CASCADE"
+        ))
+        await conn.execute(
+            text(
+                "INSERT INTO job_status (batch_id, total_hospitals, "
+                "processed_hospitals, failed_hospitals, duplicate_hospitals, "
+                "status, sys_custom_fields) "
+                "SELECT 'bench-' || b, :batch_size, :batch_size, 0, 0, "
+                "'COMPLETED', '{}'::jsonb FROM generate_series(1, :batches) AS b"
+            ),
+            {"batch_size": BATCH_SIZE, "batches": BATCHES},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO hospitals (name, address, phone, creation_batch_id, "
+                "is_active, dedup_key) "
+                "SELECT 'Bench Hospital ' || g, g || ' Bench Street', '555-0100', "
+                "CASE WHEN g <= :batch_rows "
+                "THEN 'bench-' || (1 + (g - 1) / :batch_size) END, "
+                "false, md5('bench ' || g) "
+                "FROM generate_series(1, :size) AS g"
+            ),
+            {"size": size, "batch_rows": batch_rows, "batch_size": BATCH_SIZE},
+        )
+        await conn.execute(text("ANALYZE hospitals"))
+        await conn.execute(text("ANALYZE job_status"))
+
+
+async def time_requests(ac, method, urls, before=None):
+    """
+    Times each request; `before` is awaited ahead of every request, outside
+    the timed section.
+    """
+    samples = []
+    for url in urls:
+        if before is not None:
+            await before()
+        start = time.perf_counter()
+        r = await ac.request(method, url)
+        samples.append(time.perf_counter() - start)
+        assert r.status_code < 400, (url, r.status_code)
+    return summarize(samples)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", SIZES)
+async def test_endpoint_latency(
+    test_engine, override_get_db, results, monkeypatch, size
+):
+    for task in ("activate_batch_task", "delete_batch_task"):
+        monkeypatch.setattr(
+            f"worker.tasks.{task}.delay", lambda *args, **kwargs: None
+        )
+
+    await seed(test_engine, size)
+    db = override_get_db
+    rng = random.Random(size)
+    batch_ids = [f"bench-{b}" for b in range(1, BATCHES + 1)]
+    report = {}
+
+    async with get_client() as ac:
+        report["list"] = await time_requests(
+            ac, "GET", ["/hospitals?limit=100"] * REQUESTS
+        )
+        cursors = []
+        for _ in range(REQUESTS):
+            after = rng.randint(1, size)
+            cursors.append(
+                f"/hospitals?limit=100&cursor={encode_cursor({'id': after})}"
+            )
+        report["list_deep_page"] = await time_requests(ac, "GET", cursors)
+
+        # Cleared before every request so these are uncached (DB) latencies.
+        report["get"] = await time_requests(
+            ac,
+            "GET",
+            [f"/hospitals/{rng.randint(1, size)}" for _ in range(REQUESTS)],
+            before=cache.clear,
+        )
+        report["batch"] = await time_requests(
+            ac,
+            "GET",
+            [f"/hospitals/batch/{rng.choice(batch_ids)}" for _ in range(REQUESTS)],
+            before=cache.clear,
+        )
+
+        report["activate_request"] = await time_requests(
+            ac,
+            "PATCH",
+            [f"/hospitals/batch/{batch_id}/activate" for batch_id in batch_ids],
+        )
+
+    samples = []
+    for batch_id in batch_ids:
+        start = time.perf_counter()
+        await activate_batch_hospitals(db, batch_id)
+        samples.append(time.perf_counter() - start)
+    report["activate_background"] = summarize(samples)
+
+    async with get_client() as ac:
+        report["delete_request"] = await time_requests(
+            ac, "DELETE", [f"/hospitals/batch/{batch_id}" for batch_id in batch_ids]
+        )
+
+    samples = []
+    for batch_id in batch_ids:
+        start = time.perf_counter()
+        await delete_batch_rows(db, batch_id)
+        samples.append(time.perf_counter() - start)
+    report["delete_background"] = summarize(samples)
+
+    results["sizes"].setdefault(str(size), {}).update(report)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", SIZES)
+async def test_bulk_ingestion_throughput(
+    test_engine, override_get_db, results, tmp_path, monkeypatch, size
+):
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    await seed(test_engine, size)
+    db = override_get_db
+    batch_id = f"bench-ingest-{int(time.time())}"
+
+    with open(tmp_path / "bench.csv", "w") as out:
+        out.write("name,address,phone\n")
+        for n in range(INGEST_ROWS):
+            out.write(f"Ingest {batch_id} {n},{n} Ingest Road,555-0101\n")
+
+    db.add(JobStatus(
+        batch_id=batch_id,
+        total_hospitals=INGEST_ROWS,
+        processed_hospitals=0,
+        failed_hospitals=0,
+        status="IN_PROGRESS",
+    ))
+    await db.commit()
+
+    start = time.perf_counter()
+    ranges = await plan_import_chunks(db, batch_id, "bench.csv")
+    for start_row, end_row in ranges:
+        await import_chunk(db, batch_id, "bench.csv", start_row, end_row)
+    await finalize_import(db, batch_id, "bench.csv")
+    elapsed = time.perf_counter() - start
+
+    job = await db.scalar(
+        select(JobStatus)
+        .where(JobStatus.batch_id == batch_id)
+        .execution_options(populate_existing=True)
+    )
+    assert job.status == "COMPLETED"
+    assert job.processed_hospitals == INGEST_ROWS
+
+    results["sizes"].setdefault(str(size), {})["ingest"] = {
+        "rows": INGEST_ROWS,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(INGEST_ROWS / elapsed, 1),
+    }
+
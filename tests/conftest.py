@@ -1,11 +1,14 @@
+import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncSession,
     async_sessionmaker,
 )
+from sqlalchemy import text
 from sqlalchemy.pool import NullPool
-from app.database import Base, get_db
+from app.cache import cache
+from app.database import Base, get_db, get_session_factory
 from app.main import app
 import os
 
@@ -21,6 +24,7 @@ async def test_engine():
     )
 
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
 
     yield engine
@@ -44,8 +48,21 @@ async def override_get_db(test_engine):
             yield session
 
     app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_session_factory] = lambda: async_session
+    await cache.clear()
 
     async with async_session() as session:
         yield session
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    """
+    Keeps uploads spooled by the endpoints (and left behind when the
+    import task is mocked) out of the repository's ./spool.
+    """
+    path = tmp_path / "spool"
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(path))
+    return path
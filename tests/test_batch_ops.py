@@ -0,0 +1,142 @@
+import pytest
+from sqlalchemy import select, func
+
+from app.batch_ops import (
+    activate_batch_hospitals,
+    delete_batch_rows,
+    fail_batch_activation,
+    fail_batch_deletion,
+)
+from app.cache import batch_key, cache
+from models import Hospital, JobStatus, BatchRowError
+from tests.utils import get_client
+
+
+async def seed_batch(db, batch_id, hospitals=5, errors=3):
+    db.add(JobStatus(batch_id=batch_id, total_hospitals=hospitals, status="COMPLETED"))
+    await db.commit()
+    db.add_all([
+        Hospital(name=f"{batch_id} {n}", address="Addr", creation_batch_id=batch_id)
+        for n in range(hospitals)
+    ])
+    db.add_all([
+        BatchRowError(batch_id=batch_id, row_number=n, error="bad row")
+        for n in range(errors)
+    ])
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_activate_batch_hospitals_in_chunks(override_get_db, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr("app.batch_ops.BATCH_OP_CHUNK_SIZE", 2)
+    await seed_batch(db, "ops-activate")
+
+    await activate_batch_hospitals(db, "ops-activate")
+
+    db.expire_all()
+    inactive = await db.scalar(
+        select(func.count())
+        .select_from(Hospital)
+        .where(
+            Hospital.creation_batch_id == "ops-activate",
+            Hospital.is_active.is_not(True),
+        )
+    )
+    job = await db.scalar(
+        select(JobStatus).where(JobStatus.batch_id == "ops-activate")
+    )
+    assert inactive == 0
+    assert job.sys_custom_fields["activation"] == {
+        "status": "COMPLETED",
+        "activated_hospitals": 5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_activation_can_be_restarted(override_get_db, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr(
+        "worker.tasks.activate_batch_task.delay", lambda *args, **kwargs: None
+    )
+    await seed_batch(db, "ops-activate-failed")
+
+    async with get_client() as ac:
+        r = await ac.patch("/hospitals/batch/ops-activate-failed/activate")
+        assert r.status_code == 202
+
+        # Not cached while the activation is running.
+        r = await ac.get("/hospitals/batch/ops-activate-failed")
+        assert r.json()["sys_custom_fields"]["activation"]["status"] == "IN_PROGRESS"
+        assert await cache.get(batch_key("ops-activate-failed")) is None
+
+        await fail_batch_activation(db, "ops-activate-failed", "Activation failed")
+
+        r = await ac.get("/hospitals/batch/ops-activate-failed")
+        fields = r.json()["sys_custom_fields"]
+        assert fields["batch_activated"] is False
+        assert fields["activation"] == {
+            "status": "FAILED",
+            "error": "Activation failed",
+            "activated_hospitals": 0,
+        }
+
+        r = await ac.patch("/hospitals/batch/ops-activate-failed/activate")
+        assert r.status_code == 202
+
+
+@pytest.mark.asyncio
+async def test_delete_batch_rows_in_chunks(override_get_db, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr("app.batch_ops.BATCH_OP_CHUNK_SIZE", 2)
+    await seed_batch(db, "ops-delete")
+
+    await delete_batch_rows(db, "ops-delete")
+
+    assert await db.scalar(
+        select(func.count())
+        .select_from(Hospital)
+        .where(Hospital.creation_batch_id == "ops-delete")
+    ) == 0
+    assert await db.scalar(
+        select(func.count())
+        .select_from(BatchRowError)
+        .where(BatchRowError.batch_id == "ops-delete")
+    ) == 0
+    assert await db.scalar(
+        select(JobStatus.id).where(JobStatus.batch_id == "ops-delete")
+    ) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_deletion_resumes_on_repeat_delete(override_get_db, monkeypatch):
+    db = override_get_db
+    deletions = []
+    monkeypatch.setattr(
+        "worker.tasks.delete_batch_task.delay",
+        lambda *args, **kwargs: deletions.append(args),
+    )
+    await seed_batch(db, "ops-delete-failed")
+
+    async with get_client() as ac:
+        r = await ac.delete("/hospitals/batch/ops-delete-failed")
+        assert r.status_code == 202
+
+        await fail_batch_deletion(db, "ops-delete-failed", "Deletion failed")
+
+        r = await ac.get("/hospitals/batch/ops-delete-failed")
+        assert r.json()["status"] == "DELETING"
+        assert r.json()["sys_custom_fields"]["deletion"] == {
+            "status": "FAILED",
+            "error": "Deletion failed",
+        }
+
+        r = await ac.delete("/hospitals/batch/ops-delete-failed")
+        assert r.status_code == 202
+
+    assert deletions == [("ops-delete-failed",), ("ops-delete-failed",)]
+
+    await delete_batch_rows(db, "ops-delete-failed")
+    assert await db.scalar(
+        select(JobStatus.id).where(JobStatus.batch_id == "ops-delete-failed")
+    ) is None
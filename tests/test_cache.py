@@ -0,0 +1,85 @@
+import pytest
+
+from app.cache import Cache, LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", "1", ttl=60)
+    lru.set("b", "2", ttl=60)
+    lru.get("a")
+    lru.set("c", "3", ttl=60)
+
+    assert lru.get("a") == "1"
+    assert lru.get("b") is None
+    assert lru.get("c") == "3"
+
+
+def test_lru_cache_expires_entries():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", "1", ttl=-1)
+
+    assert lru.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_counts_hits_and_invalidates():
+    cache = Cache(redis_url=None, ttl=60, max_entries=10, max_value_bytes=1024)
+
+    assert await cache.get("k") is None
+    await cache.set("k", {"id": 1})
+    assert await cache.get("k") == {"id": 1}
+    await cache.invalidate(["k"])
+    assert await cache.get("k") is None
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_without_local_fallback_stores_nothing():
+    cache = Cache(
+        redis_url=None,
+        ttl=60,
+        max_entries=10,
+        max_value_bytes=1024,
+        local_fallback=False,
+    )
+
+    await cache.set("k", {"id": 1})
+
+    assert await cache.get("k") is None
+    assert cache.stats()["backend"] == "disabled"
+
+
+@pytest.mark.asyncio
+async def test_cache_check_warns_when_disabled(caplog):
+    cache = Cache(
+        redis_url=None,
+        ttl=60,
+        max_entries=10,
+        max_value_bytes=1024,
+        local_fallback=False,
+    )
+
+    await cache.check()
+
+    assert "Cache disabled" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_cache_check_warns_when_redis_is_unreachable(caplog):
+    cache = Cache(
+        redis_url="redis://127.0.0.1:1/0",
+        ttl=60,
+        max_entries=10,
+        max_value_bytes=1024,
+        local_fallback=False,
+    )
+
+    try:
+        await cache.check()
+    finally:
+        await cache.close()
+
+    assert "nothing is cached" in caplog.text
@@ -0,0 +1,120 @@
+import gzip
+import io
+
+import pytest
+
+from app.compression import (
+    CompressionError,
+    DecompressedSizeExceeded,
+    DecompressingReader,
+    open_decompressed,
+    upload_compression,
+)
+from tests.utils import get_client
+
+CSV_CONTENT = b"name,address\nA,Addr A\nB,Addr B\n"
+
+
+def test_upload_compression_from_file_name():
+    assert upload_compression("hospitals.csv") is None
+    assert upload_compression("hospitals.CSV.GZ") == "gzip"
+    assert upload_compression("hospitals.csv.zst") == "zstd"
+    with pytest.raises(ValueError):
+        upload_compression("hospitals.txt.gz")
+
+
+def test_open_decompressed_gzip_multi_member():
+    raw = io.BytesIO(gzip.compress(CSV_CONTENT[:13]) + gzip.compress(CSV_CONTENT[13:]))
+
+    assert open_decompressed(raw, "gzip").read() == CSV_CONTENT
+
+
+def test_open_decompressed_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    raw = io.BytesIO(zstandard.ZstdCompressor().compress(CSV_CONTENT))
+
+    assert open_decompressed(raw, "zstd").read() == CSV_CONTENT
+
+
+def test_decompressing_reader_rejects_corrupt_and_oversized_data():
+    with pytest.raises(CompressionError):
+        open_decompressed(io.BytesIO(b"not gzip at all"), "gzip").read()
+
+    with pytest.raises(CompressionError):
+        open_decompressed(io.BytesIO(gzip.compress(CSV_CONTENT)[:-12]), "gzip").read()
+
+    reader = DecompressingReader(
+        io.BytesIO(gzip.compress(b"x" * 10_000)), "gzip", max_bytes=1000
+    )
+    with pytest.raises(DecompressedSizeExceeded):
+        io.BufferedReader(reader).read()
+
+
+@pytest.mark.asyncio
+async def test_validate_accepts_gzipped_upload():
+    files = {
+        "file": (
+            "hospitals.csv.gz",
+            io.BytesIO(gzip.compress(CSV_CONTENT)),
+            "application/gzip",
+        )
+    }
+
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/bulk/validate", files=files)
+        corrupt = await ac.post(
+            "/hospitals/bulk/validate",
+            files={"file": ("hospitals.csv.gz", io.BytesIO(b"oops"), "application/gzip")},
+        )
+
+    assert r.status_code == 200
+    assert r.json()["total_rows"] == 2
+    assert corrupt.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_gzip_request_body_is_inflated():
+    async with get_client() as ac:
+        plain = await ac.post(
+            "/hospitals/bulk/validate",
+            files={"file": ("hospitals.csv", io.BytesIO(CSV_CONTENT), "text/csv")},
+        )
+        request = ac.build_request(
+            "POST",
+            "/hospitals/bulk/validate",
+            files={"file": ("hospitals.csv", io.BytesIO(CSV_CONTENT), "text/csv")},
+        )
+        body = gzip.compress(request.read())
+        r = await ac.post(
+            "/hospitals/bulk/validate",
+            content=body,
+            headers={
+                "Content-Type": request.headers["Content-Type"],
+                "Content-Encoding": "gzip",
+            },
+        )
+        corrupt = await ac.post(
+            "/hospitals/bulk/validate",
+            content=body[:-20],
+            headers={
+                "Content-Type": request.headers["Content-Type"],
+                "Content-Encoding": "gzip",
+            },
+        )
+
+    assert r.status_code == 200
+    assert r.json() == plain.json()
+    assert corrupt.status_code == 400
+    assert corrupt.json() == {"detail": "Invalid gzip request body"}
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped_when_accepted():
+    async with get_client() as ac:
+        await ac.get("/cache/stats")
+        r = await ac.get("/metrics", headers={"Accept-Encoding": "gzip"})
+        identity = await ac.get("/metrics", headers={"Accept-Encoding": "identity"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert "hms_http_request_duration_seconds" in r.text
+    assert "content-encoding" not in identity.headers
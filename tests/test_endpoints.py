@@ -1,7 +1,17 @@
+import csv
+import gzip
 import io
+import json
+import threading
 import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update
 
-from models import Hospital, JobStatus
+from models import Hospital, JobStatus, BatchRowError, UploadPart
+from app.database import get_session_factory
+from app.main import app
+from app import storage
+from app.storage import open_spooled, remove_spooled
 from tests.utils import get_client
 
 
@@ -27,6 +37,156 @@ async def test_list_hospitals(override_get_db):
         assert r.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_list_hospitals_keyset_pagination(override_get_db):
+    async with get_client() as ac:
+        created = []
+        for name in ("Page A", "Page B", "Page C"):
+            r = await ac.post(
+                "/hospitals",
+                json={"name": name, "address": f"{name} St"},
+            )
+            created.append(r.json()["id"])
+
+        seen = []
+        params = {"limit": 2}
+        while True:
+            r = await ac.get("/hospitals", params=params)
+            assert r.status_code == 200
+            page = r.json()
+            assert len(page["hospitals"]) <= 2
+            seen.extend(h["id"] for h in page["hospitals"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        assert seen == sorted(set(seen))
+        assert set(created) <= set(seen)
+
+        r = await ac.get("/hospitals", params={"cursor": "not-a-cursor"})
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_hospitals_batch_json_and_ndjson(override_get_db):
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/batch", json=[
+            {"name": "Batch One", "address": "1 Batch Rd"},
+            {"name": "Batch Two", "address": "2 Batch Rd", "phone": "555"},
+            {"name": "batch  one", "address": "1 BATCH RD"},
+        ])
+        assert r.status_code == 201
+        body = r.json()
+        assert body["created"] == 2
+        assert [h["index"] for h in body["hospitals"]] == [0, 1]
+        assert body["duplicates"] == [2]
+
+        r = await ac.get(f"/hospitals/{body['hospitals'][1]['id']}")
+        assert r.json()["phone"] == "555"
+
+        ndjson = (
+            b'{"name": "Batch Three", "address": "3 Batch Rd"}\n'
+            b'{"name": "Batch Two", "address": "2 Batch Rd"}\n'
+        )
+        r = await ac.post(
+            "/hospitals/batch",
+            content=ndjson,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert r.status_code == 201
+        assert r.json()["created"] == 1
+        assert r.json()["duplicates"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_create_hospitals_batch_is_all_or_nothing(override_get_db):
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/batch", json=[
+            {"name": "Never Created", "address": "4 Batch Rd"},
+            {"name": "No Address"},
+            {"name": "", "address": "5 Batch Rd"},
+        ])
+        assert r.status_code == 422
+        detail = r.json()["detail"]
+        assert detail["total_errors"] == 2
+        assert detail["errors"][0].startswith("Item 1: address")
+
+        r = await ac.get("/hospitals/search", params={"q": "Never Created"})
+        assert r.json()["hospitals"] == []
+
+        r = await ac.post(
+            "/hospitals/batch",
+            content=b"name,address",
+            headers={"Content-Type": "text/csv"},
+        )
+        assert r.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_list_hospitals_ndjson(override_get_db):
+    async with get_client() as ac:
+        await ac.post("/hospitals", json={"name": "Stream", "address": "S St"})
+        r = await ac.get("/hospitals", params={"format": "ndjson"})
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert any(h["name"] == "Stream" for h in lines)
+
+
+@pytest.mark.asyncio
+async def test_export_hospitals_csv_and_gzip(override_get_db):
+    async with get_client() as ac:
+        await ac.post("/hospitals", json={"name": "Export Me", "address": "E St"})
+        r = await ac.get("/hospitals/export")
+        gz = await ac.get("/hospitals/export", params={"gzip": "true"})
+        missing = await ac.get("/hospitals/batch/no-such-batch/export")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert any(row["name"] == "Export Me" for row in rows)
+
+    # httpx decodes Content-Encoding transparently.
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.text == r.text
+
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_export_streams_pages_in_short_sessions(override_get_db, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr("app.streaming.STREAM_FETCH_SIZE", 2)
+    db.add(JobStatus(batch_id="export-pages", total_hospitals=5, status="COMPLETED"))
+    await db.commit()
+    db.add_all([
+        Hospital(name=f"Page {n}", address="P St", creation_batch_id="export-pages")
+        for n in range(5)
+    ])
+    await db.commit()
+
+    session_factory = app.dependency_overrides[get_session_factory]()
+    sessions = []
+
+    def counting_factory():
+        sessions.append(1)
+        return session_factory()
+
+    app.dependency_overrides[get_session_factory] = lambda: counting_factory
+
+    async with get_client() as ac:
+        r = await ac.get(
+            "/hospitals/batch/export-pages/export", params={"format": "ndjson"}
+        )
+
+    assert [json.loads(line)["name"] for line in r.text.splitlines()] == [
+        f"Page {n}" for n in range(5)
+    ]
+    # Pages of 2, 2 and 1 rows, each read in its own session.
+    assert len(sessions) == 3
+
+
 @pytest.mark.asyncio
 async def test_get_hospital_found_and_not_found(override_get_db):
     async with get_client() as ac:
@@ -78,10 +238,81 @@ async def test_get_hospital_batch_found(override_get_db):
 async def test_activate_and_delete_batch(override_get_db):
     async with get_client() as ac:
         r = await ac.patch("/hospitals/batch/b-1/activate")
-        assert r.status_code in (200, 404)
+        assert r.status_code in (202, 404)
 
         r = await ac.delete("/hospitals/batch/b-1")
-        assert r.status_code in (204, 404)
+        assert r.status_code in (202, 404)
+
+
+@pytest.mark.asyncio
+async def test_activate_and_delete_batch_run_in_background(override_get_db, monkeypatch):
+    db = override_get_db
+    activations, deletions = [], []
+    monkeypatch.setattr(
+        "worker.tasks.activate_batch_task.delay",
+        lambda *args, **kwargs: activations.append(args),
+    )
+    monkeypatch.setattr(
+        "worker.tasks.delete_batch_task.delay",
+        lambda *args, **kwargs: deletions.append(args),
+    )
+
+    db.add(JobStatus(batch_id="batch-bg", total_hospitals=0, status="COMPLETED"))
+    await db.commit()
+
+    async with get_client() as ac:
+        r = await ac.patch("/hospitals/batch/batch-bg/activate")
+        assert r.status_code == 202
+        assert r.json()["activation"]["status"] == "IN_PROGRESS"
+
+        r = await ac.patch("/hospitals/batch/batch-bg/activate")
+        assert r.status_code == 400
+
+        r = await ac.delete("/hospitals/batch/batch-bg")
+        assert r.status_code == 202
+        assert r.json()["status"] == "DELETING"
+
+        r = await ac.get("/hospitals/batch/batch-bg")
+        assert r.json()["status"] == "DELETING"
+
+        # Resubmitted, in case the first job was lost.
+        r = await ac.delete("/hospitals/batch/batch-bg")
+        assert r.status_code == 202
+
+    assert activations == [("batch-bg",)]
+    assert deletions == [("batch-bg",), ("batch-bg",)]
+
+
+@pytest.mark.asyncio
+async def test_activation_rolled_back_when_submit_fails(override_get_db, monkeypatch):
+    db = override_get_db
+    activations = []
+
+    def _unavailable(*args, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr("worker.tasks.activate_batch_task.delay", _unavailable)
+
+    db.add(JobStatus(batch_id="batch-nobroker", total_hospitals=0, status="COMPLETED"))
+    await db.commit()
+
+    async with get_client() as ac:
+        r = await ac.patch("/hospitals/batch/batch-nobroker/activate")
+        assert r.status_code == 503
+
+        r = await ac.get("/hospitals/batch/batch-nobroker")
+        fields = r.json()["sys_custom_fields"]
+        assert fields["batch_activated"] is False
+        assert fields["activation"]["status"] == "FAILED"
+
+        monkeypatch.setattr(
+            "worker.tasks.activate_batch_task.delay",
+            lambda *args, **kwargs: activations.append(args),
+        )
+        r = await ac.patch("/hospitals/batch/batch-nobroker/activate")
+        assert r.status_code == 202
+
+    assert activations == [("batch-nobroker",)]
 
 
 @pytest.mark.asyncio
@@ -112,4 +343,305 @@ async def test_bulk_create_errors(override_get_db):
     async with get_client() as ac:
         files = {"file": ("bad.txt", io.BytesIO(b"x,y"), "text/plain")}
         r = await ac.post("/hospitals/bulk", files=files)
-    assert r.status_code == 400
\ No newline at end of file
+    assert r.status_code == 400
+
+@pytest.mark.asyncio
+async def test_bulk_create_sends_spool_reference(override_get_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "worker.tasks.process_bulk_hospitals.delay",
+        lambda *args, **kwargs: calls.append(args),
+    )
+    # The copy and hash run off the event loop's thread.
+    spool_threads = []
+    spool = storage._spool
+
+    def _spool(*args):
+        spool_threads.append(threading.get_ident())
+        return spool(*args)
+
+    monkeypatch.setattr("app.storage._spool", _spool)
+
+    files = {
+        "file": ("hospitals.csv", io.BytesIO(b"name,address\nA,Addr A\n"), "text/csv")
+    }
+
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/bulk", files=files)
+
+    assert r.status_code == 201
+    batch_id, upload_ref = calls[0]
+    assert batch_id == r.json()["batch_id"]
+    with open_spooled(upload_ref) as csv_file:
+        assert csv_file.read() == "name,address\nA,Addr A\n"
+    remove_spooled(upload_ref)
+    assert spool_threads and threading.get_ident() not in spool_threads
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_stores_upload_in_database(
+    override_get_db, spool_dir, monkeypatch
+):
+    db = override_get_db
+    monkeypatch.setattr("app.main.UPLOAD_STORE", "database")
+    monkeypatch.setattr("app.storage.UPLOAD_STORE", "database")
+    monkeypatch.setattr("app.storage.UPLOAD_CHUNK_SIZE", 10)
+    calls = []
+    monkeypatch.setattr(
+        "worker.tasks.process_bulk_hospitals.delay",
+        lambda *args, **kwargs: calls.append(args),
+    )
+    csv_content = b"name,address\nStored,Addr Stored\n"
+
+    async with get_client() as ac:
+        r = await ac.post(
+            "/hospitals/bulk",
+            files={"file": ("hospitals.csv", io.BytesIO(csv_content), "text/csv")},
+        )
+
+    assert r.status_code == 201
+    batch_id, _ = calls[0]
+    result = await db.execute(
+        select(UploadPart.data)
+        .where(UploadPart.batch_id == batch_id)
+        .order_by(UploadPart.part)
+    )
+    assert b"".join(result.scalars()) == csv_content
+    # Only the database copy is kept.
+    assert list(spool_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_spools_decompressed_upload(override_get_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "worker.tasks.process_bulk_hospitals.delay",
+        lambda *args, **kwargs: calls.append(args),
+    )
+
+    csv_content = b"name,address\nGz,Addr Gz\n"
+    files = {
+        "file": (
+            "hospitals.csv.gz",
+            io.BytesIO(gzip.compress(csv_content)),
+            "application/gzip",
+        )
+    }
+
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/bulk", files=files)
+
+    assert r.status_code == 201
+    assert r.json()["total_hospitals"] == 1
+    _, upload_ref = calls[0]
+    with open_spooled(upload_ref) as csv_file:
+        assert csv_file.read() == csv_content.decode()
+    remove_spooled(upload_ref)
+
+
+@pytest.mark.asyncio
+async def test_validate_csv_reports_error_counts(override_get_db):
+    csv_content = b"name,address\nA,\n,Addr B\nC,Addr C\n"
+    files = {"file": ("hospitals.csv", io.BytesIO(csv_content), "text/csv")}
+
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/bulk/validate", files=files)
+
+    assert r.status_code == 400
+    detail = r.json()["detail"]
+    assert detail["total_errors"] == 2
+    assert detail["error_counts"] == {"missing_address": 1, "missing_name": 1}
+
+
+@pytest.mark.asyncio
+async def test_get_batch_errors_paginated(override_get_db):
+    db = override_get_db
+
+    db.add(JobStatus(batch_id="batch-errors", total_hospitals=3))
+    await db.commit()
+    db.add_all([
+        BatchRowError(batch_id="batch-errors", row_number=n, error="bad row")
+        for n in (1, 2, 3)
+    ])
+    await db.commit()
+
+    async with get_client() as ac:
+        r = await ac.get("/hospitals/batch/batch-errors/errors?limit=2")
+        assert r.status_code == 200
+        page = r.json()
+        assert [e["row_number"] for e in page["errors"]] == [1, 2]
+
+        r = await ac.get(
+            "/hospitals/batch/batch-errors/errors",
+            params={"cursor": page["next_cursor"]},
+        )
+        page = r.json()
+        assert [e["row_number"] for e in page["errors"]] == [3]
+        assert page["next_cursor"] is None
+
+        r = await ac.get("/hospitals/batch/missing/errors")
+        assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_list_batches_filters_and_paginates(override_get_db):
+    db = override_get_db
+    base = datetime(2001, 1, 1, tzinfo=timezone.utc)
+
+    db.add_all([
+        JobStatus(
+            batch_id=f"index-{n}",
+            total_hospitals=n,
+            status="FAILED" if n == 2 else "COMPLETED",
+            created_at=base + timedelta(minutes=n),
+            sys_custom_fields={"big": "blob"},
+        )
+        for n in range(4)
+    ])
+    await db.commit()
+
+    window = {
+        "created_after": (base - timedelta(seconds=1)).isoformat(),
+        "created_before": (base + timedelta(hours=1)).isoformat(),
+    }
+
+    async with get_client() as ac:
+        r = await ac.get("/hospitals/batches", params={**window, "limit": 2})
+        assert r.status_code == 200
+        page = r.json()
+        assert [b["batch_id"] for b in page["batches"]] == ["index-3", "index-2"]
+        assert "sys_custom_fields" not in page["batches"][0]
+
+        r = await ac.get(
+            "/hospitals/batches",
+            params={**window, "limit": 2, "cursor": page["next_cursor"]},
+        )
+        page = r.json()
+        assert [b["batch_id"] for b in page["batches"]] == ["index-1", "index-0"]
+        assert page["next_cursor"] is None
+
+        r = await ac.get(
+            "/hospitals/batches", params={**window, "status": "FAILED"}
+        )
+        assert [b["batch_id"] for b in r.json()["batches"]] == ["index-2"]
+
+        r = await ac.get("/hospitals/batches", params={"cursor": "nope"})
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_deduplicates_identical_upload(override_get_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "worker.tasks.process_bulk_hospitals.delay",
+        lambda *args, **kwargs: calls.append(args),
+    )
+
+    csv_content = b"name,address\nDup A,Addr A\nDup B,Addr B\n"
+
+    async with get_client() as ac:
+        first = await ac.post(
+            "/hospitals/bulk",
+            files={"file": ("a.csv", io.BytesIO(csv_content), "text/csv")},
+        )
+        second = await ac.post(
+            "/hospitals/bulk",
+            files={"file": ("b.csv", io.BytesIO(csv_content), "text/csv")},
+        )
+
+    assert first.status_code == 201
+    assert second.status_code == 200
+    assert second.json()["duplicate"] is True
+    assert second.json()["batch_id"] == first.json()["batch_id"]
+    assert second.json()["total_hospitals"] == 2
+    assert len(calls) == 1
+
+    # A batch being deleted no longer counts as the original upload.
+    await override_get_db.execute(
+        update(JobStatus)
+        .where(JobStatus.batch_id == first.json()["batch_id"])
+        .values(status="DELETING")
+    )
+    await override_get_db.commit()
+
+    async with get_client() as ac:
+        third = await ac.post(
+            "/hospitals/bulk",
+            files={"file": ("c.csv", io.BytesIO(csv_content), "text/csv")},
+        )
+
+    assert third.status_code == 201
+    assert third.json()["batch_id"] != first.json()["batch_id"]
+    for _, upload_ref in calls:
+        remove_spooled(upload_ref)
+
+
+@pytest.mark.asyncio
+async def test_get_hospital_served_from_cache(override_get_db, monkeypatch):
+    # Off by default with the Celery backend and no Redis.
+    monkeypatch.setattr("app.main.cache.local_fallback", True)
+
+    async with get_client() as ac:
+        create = await ac.post(
+            "/hospitals",
+            json={"name": "Cached", "address": "Cache St"},
+        )
+        hospital_id = create.json()["id"]
+
+        first = await ac.get(f"/hospitals/{hospital_id}")
+        second = await ac.get(f"/hospitals/{hospital_id}")
+        stats = (await ac.get("/cache/stats")).json()
+
+    assert first.json() == second.json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_hospitals_ranks_prefix_matches(override_get_db):
+    async with get_client() as ac:
+        for name, address in (
+            ("Riverside General", "1 Elm St"),
+            ("General Riverside", "2 Oak St"),
+            ("Unrelated Clinic", "3 Pine St"),
+        ):
+            await ac.post("/hospitals", json={"name": name, "address": address})
+
+        r = await ac.get("/hospitals/search", params={"q": "Riverside"})
+        assert r.status_code == 200
+        names = [h["name"] for h in r.json()["hospitals"]]
+        assert names[0] == "Riverside General"
+        assert "General Riverside" in names
+        assert "Unrelated Clinic" not in names
+
+        r = await ac.get("/hospitals/search", params={"q": "Ri"})
+        assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_create_hospital_rejects_duplicate(override_get_db):
+    async with get_client() as ac:
+        r = await ac.post(
+            "/hospitals",
+            json={"name": "Twin Clinic", "address": "5 Twin Rd"},
+        )
+        assert r.status_code == 201
+
+        r = await ac.post(
+            "/hospitals",
+            json={"name": "TWIN clinic", "address": "5 twin rd."},
+        )
+        assert r.status_code == 409
+
+        # Non-Latin names are compared too, not folded away.
+        r = await ac.post(
+            "/hospitals",
+            json={"name": "東京病院", "address": "東京都"},
+        )
+        assert r.status_code == 201
+
+        r = await ac.post(
+            "/hospitals",
+            json={"name": "大阪病院", "address": "大阪府"},
+        )
+        assert r.status_code == 201
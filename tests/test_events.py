@@ -0,0 +1,80 @@
+import pytest
+
+from app.events import EventBroker, batch_event_stream, publish_batch_progress
+from models import JobStatus
+from tests.utils import get_client
+
+
+@pytest.mark.asyncio
+async def test_event_broker_fans_out_and_keeps_latest():
+    broker = EventBroker(redis_url=None, queue_size=2)
+
+    async with broker.subscribe("c") as first, broker.subscribe("c") as second:
+        for n in range(3):
+            await broker.publish("c", {"n": n})
+
+        assert [first.get_nowait(), first.get_nowait()] == [{"n": 1}, {"n": 2}]
+        assert second.qsize() == 2
+
+    # Nobody listening any more.
+    await broker.publish("c", {"n": 3})
+
+
+@pytest.mark.asyncio
+async def test_batch_event_stream_pushes_progress_until_done(
+    override_get_db, monkeypatch
+):
+    db = override_get_db
+    monkeypatch.setattr("app.events.broker", EventBroker(None, queue_size=10))
+
+    db.add(JobStatus(
+        batch_id="events-1",
+        total_hospitals=2,
+        processed_hospitals=0,
+        failed_hospitals=0,
+        status="IN_PROGRESS",
+    ))
+    await db.commit()
+
+    stream = batch_event_stream(db, "events-1")
+    assert (await stream.__anext__()).startswith(b"event: progress")
+
+    snapshot = {
+        "batch_id": "events-1",
+        "status": "IN_PROGRESS",
+        "total_hospitals": 2,
+        "processed_hospitals": 1,
+        "failed_hospitals": 0,
+        "duplicate_hospitals": 0,
+    }
+    await publish_batch_progress("events-1", snapshot)
+    assert b'"processed_hospitals":1' in await stream.__anext__()
+
+    await publish_batch_progress(
+        "events-1",
+        {**snapshot, "status": "COMPLETED", "processed_hospitals": 2},
+    )
+    assert (await stream.__anext__()).startswith(b"event: done")
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batch_events_endpoint(override_get_db):
+    db = override_get_db
+    db.add(JobStatus(
+        batch_id="events-2",
+        total_hospitals=1,
+        processed_hospitals=1,
+        failed_hospitals=0,
+        status="COMPLETED",
+    ))
+    await db.commit()
+
+    async with get_client() as ac:
+        r = await ac.get("/hospitals/batch/events-2/events")
+        missing = await ac.get("/hospitals/batch/no-such-batch/events")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text.startswith("event: done\n")
+    assert missing.status_code == 404
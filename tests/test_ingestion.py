@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, func, update
+
+from app.ingestion import (
+    StageTimings,
+    finalize_import,
+    import_chunk,
+    insert_chunk,
+    iter_chunks,
+    plan_import_chunks,
+    scan_row_offsets,
+)
+from app.storage import store_upload
+from models import Hospital, JobStatus, ImportChunk, UploadPart
+
+
+@pytest.mark.asyncio
+async def test_insert_chunk_records_bad_rows(override_get_db):
+    db = override_get_db
+
+    db.add(JobStatus(batch_id="ingest-1", total_hospitals=3))
+    await db.commit()
+
+    rows = [
+        {"name": "A", "address": "Addr A", "phone": "1"},
+        {"name": "B", "address": "", "phone": "2"},
+        {"name": "C", "address": "Addr C", "phone": "9" * 50},
+    ]
+    inserted, errors = 0, []
+    for chunk in iter_chunks(rows, 2):
+        chunk_inserted, _, chunk_errors = await insert_chunk(db, "ingest-1", chunk)
+        inserted += chunk_inserted
+        errors.extend(chunk_errors)
+    await db.commit()
+
+    assert inserted == 1
+    assert [(idx, key) for idx, key, _ in errors] == [(2, "B"), (3, "C")]
+
+    count = await db.scalar(
+        select(func.count()).where(Hospital.creation_batch_id == "ingest-1")
+    )
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_chunked_import_resumes_and_aggregates(override_get_db, tmp_path, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr("app.ingestion.BULK_PARALLEL_CHUNK_ROWS", 2)
+    (tmp_path / "chunks.csv").write_text(
+        "name,address\nR1,Addr 1\nR2,Addr 2\nR3,\n"
+    )
+
+    db.add(JobStatus(batch_id="ingest-chunks", total_hospitals=3))
+    await db.commit()
+
+    ranges = await plan_import_chunks(db, "ingest-chunks", "chunks.csv")
+    assert ranges == [(1, 2), (3, 3)]
+
+    # Simulate an earlier attempt that committed row 1 before failing.
+    db.add(Hospital(name="R1", address="Addr 1", creation_batch_id="ingest-chunks"))
+    await db.execute(
+        update(ImportChunk)
+        .where(ImportChunk.batch_id == "ingest-chunks", ImportChunk.start_row == 1)
+        # No offset: the chunk finds its place by scanning the file.
+        .values(checkpoint_row=1, checkpoint_offset=None)
+    )
+    await db.execute(
+        update(JobStatus)
+        .where(JobStatus.batch_id == "ingest-chunks")
+        .values(processed_hospitals=1)
+    )
+    await db.commit()
+
+    for start_row, end_row in reversed(ranges):
+        await import_chunk(db, "ingest-chunks", "chunks.csv", start_row, end_row)
+    await finalize_import(db, "ingest-chunks", "chunks.csv")
+
+    db.expire_all()
+    job = await db.scalar(
+        select(JobStatus).where(JobStatus.batch_id == "ingest-chunks")
+    )
+    assert job.status == "COMPLETED_WITH_ERRORS"
+    assert job.processed_hospitals == 2
+    assert job.failed_hospitals == 1
+    assert job.timings["chunks"] == 2
+    assert job.timings["rows"] == 2
+    assert job.timings["peak_insert_rows"] == 1
+    assert set(job.timings["stages"]) == {
+        "queue_wait", "parse", "validate", "insert", "commit"
+    }
+
+    names = (await db.scalars(
+        select(Hospital.name)
+        .where(Hospital.creation_batch_id == "ingest-chunks")
+        .order_by(Hospital.name)
+    )).all()
+    assert names == ["R1", "R2"]
+    assert not (tmp_path / "chunks.csv").exists()
+
+
+@pytest.mark.asyncio
+async def test_import_reads_upload_stored_in_database(
+    override_get_db, tmp_path, monkeypatch
+):
+    db = override_get_db
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr("app.storage.UPLOAD_STORE", "database")
+    monkeypatch.setattr("app.storage.UPLOAD_CHUNK_SIZE", 8)
+    (tmp_path / "stored.csv").write_text("name,address\nS1,Addr 1\nS2,Addr 2\n")
+
+    db.add(JobStatus(batch_id="ingest-stored", total_hospitals=2))
+    await store_upload(db, "ingest-stored", "stored.csv")
+    await db.commit()
+    # A worker on another host has no copy in its spool directory.
+    (tmp_path / "stored.csv").unlink()
+
+    ranges = await plan_import_chunks(db, "ingest-stored", "stored.csv")
+    for start_row, end_row in ranges:
+        await import_chunk(db, "ingest-stored", "stored.csv", start_row, end_row)
+    await finalize_import(db, "ingest-stored", "stored.csv")
+
+    db.expire_all()
+    job = await db.scalar(
+        select(JobStatus).where(JobStatus.batch_id == "ingest-stored")
+    )
+    assert job.status == "COMPLETED"
+    assert job.processed_hospitals == 2
+    assert not await db.scalar(
+        select(func.count()).where(UploadPart.batch_id == "ingest-stored")
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_processing_time_excludes_queue_wait(override_get_db, tmp_path, monkeypatch):
+    db = override_get_db
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    (tmp_path / "queued.csv").write_text("name,address\nQ1,Addr 1\n")
+
+    # Waited ten minutes for a worker.
+    db.add(JobStatus(
+        batch_id="ingest-queued",
+        total_hospitals=1,
+        created_at=datetime.now(timezone.utc) - timedelta(minutes=10),
+    ))
+    await db.commit()
+
+    ranges = await plan_import_chunks(db, "ingest-queued", "queued.csv")
+    for start_row, end_row in ranges:
+        await import_chunk(db, "ingest-queued", "queued.csv", start_row, end_row)
+    await finalize_import(db, "ingest-queued", "queued.csv")
+
+    db.expire_all()
+    job = await db.scalar(
+        select(JobStatus).where(JobStatus.batch_id == "ingest-queued")
+    )
+    assert job.status == "COMPLETED"
+    assert job.started_at is not None
+    assert job.processing_time_seconds < 60
+    assert job.timings["wall_seconds"] == job.processing_time_seconds
+    assert 590 < job.timings["stages"]["queue_wait"] < 660
+
+
+def test_scan_row_offsets_handles_quoted_newlines(tmp_path):
+    content = 'name,address\nA,"1\nMain St"\n\nB,Addr B\nC,Addr C\n'.encode()
+    (tmp_path / "offsets.csv").write_bytes(content)
+
+    offsets = scan_row_offsets(tmp_path / "offsets.csv", [1, 2, 3, 4])
+
+    assert content[offsets[1]:].startswith(b"A,")
+    assert content[offsets[2]:].startswith(b"B,")
+    assert content[offsets[3]:].startswith(b"C,")
+    assert offsets[4] == len(content)
+
+
+@pytest.mark.asyncio
+async def test_insert_chunk_skips_duplicates(override_get_db):
+    db = override_get_db
+
+    db.add(JobStatus(batch_id="ingest-dup", total_hospitals=4))
+    await db.commit()
+    db.add(Hospital(name="Existing Clinic", address="1 Main St."))
+    await db.commit()
+
+    rows = [
+        {"name": "existing   clinic", "address": "1 MAIN ST"},
+        {"name": "Fresh Clinic", "address": "2 Main St"},
+        {"name": "Fresh, Clinic!", "address": "2 main st"},
+        {"name": "Other Clinic", "address": "3 Main St"},
+    ]
+    seen = set()
+    inserted, duplicates, errors = await insert_chunk(
+        db, "ingest-dup", list(enumerate(rows, start=1)), seen
+    )
+    await db.commit()
+
+    assert (inserted, duplicates, errors) == (2, 2, [])
+
+
+def test_stage_timings_merge_sums_stages_and_keeps_peaks():
+    total = StageTimings()
+    total.merge(StageTimings(parse=1.0, insert=2.0, rows=100, peak_insert_rows=50))
+    total.merge(StageTimings.from_dict(
+        {"parse": 0.5, "commit": 1.0, "rows": 100, "peak_insert_rows": 80}
+    ))
+
+    summary = total.summary(wall_seconds=2.0, chunks=2, queue_wait=3.0)
+
+    assert summary["stages"] == {
+        "queue_wait": 3.0,
+        "parse": 1.5, "validate": 0.0, "insert": 2.0, "commit": 1.0,
+    }
+    assert summary["rows"] == 200
+    assert summary["rows_per_second"] == 100.0
+    assert summary["peak_insert_rows"] == 80
@@ -0,0 +1,169 @@
+import io
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import jobs
+from app.jobs import InProcessBackend
+from models import Hospital, JobStatus
+from tests.utils import get_client
+
+
+@pytest.mark.asyncio
+async def test_in_process_backend_retries_then_calls_failure_handler(monkeypatch):
+    calls = []
+
+    async def flaky(factory, value):
+        calls.append(value)
+        raise RuntimeError("boom")
+
+    async def on_failure(factory, value):
+        calls.append(f"failed {value}")
+
+    monkeypatch.setitem(jobs.IN_PROCESS_JOBS, "flaky", (flaky, on_failure))
+    backend = InProcessBackend(
+        queue_size=1, concurrency=1, session_factory=None, retry_delay=0
+    )
+
+    await backend.submit("flaky", "x")
+    await backend.join()
+    await backend.stop()
+
+    assert calls == ["x"] * (jobs.MAX_RETRIES + 1) + ["failed x"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_runs_in_process(
+    test_engine, override_get_db, tmp_path, monkeypatch
+):
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    backend = InProcessBackend(
+        queue_size=10,
+        concurrency=2,
+        session_factory=async_sessionmaker(
+            test_engine, expire_on_commit=False, class_=AsyncSession
+        ),
+    )
+    monkeypatch.setattr("app.jobs.backend", backend)
+
+    files = {
+        "file": (
+            "inprocess.csv",
+            io.BytesIO(b"name,address\nIn Process A,1 Loop Rd\nIn Process B,2 Loop Rd\n"),
+            "text/csv",
+        )
+    }
+    async with get_client() as ac:
+        r = await ac.post("/hospitals/bulk", files=files)
+    assert r.status_code == 201
+    batch_id = r.json()["batch_id"]
+
+    await backend.join()
+    await backend.stop()
+
+    db = override_get_db
+    job = await db.scalar(select(JobStatus).where(JobStatus.batch_id == batch_id))
+    assert job.status == "COMPLETED"
+    assert job.processed_hospitals == 2
+
+    names = (await db.scalars(
+        select(Hospital.name)
+        .where(Hospital.creation_batch_id == batch_id)
+        .order_by(Hospital.name)
+    )).all()
+    assert names == ["In Process A", "In Process B"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_job_owned_by_another_process_is_not_submitted(test_engine, monkeypatch):
+    calls = []
+
+    async def record(factory, batch_id):
+        calls.append(batch_id)
+
+    monkeypatch.setitem(jobs.IN_PROCESS_JOBS, "delete_batch", (record, None))
+    factory = async_sessionmaker(test_engine, expire_on_commit=False, class_=AsyncSession)
+    owner = InProcessBackend(queue_size=1, concurrency=1, session_factory=factory)
+    other = InProcessBackend(queue_size=1, concurrency=1, session_factory=factory)
+
+    await owner.start()
+    assert await owner._claim("delete_batch", "jobs-owned")
+
+    await other.submit("delete_batch", "jobs-owned")
+    await other.join()
+    assert calls == []
+
+    # Stopping (or dying) releases the lock with the connection.
+    await owner.stop()
+    await other.submit("delete_batch", "jobs-owned")
+    await other.join()
+    await other.stop()
+    assert calls == ["jobs-owned"]
+
+
+@pytest.mark.asyncio
+async def test_recover_resubmits_unfinished_batches(
+    test_engine, override_get_db, tmp_path, monkeypatch
+):
+    db = override_get_db
+    monkeypatch.setattr("app.storage.UPLOAD_SPOOL_DIR", str(tmp_path))
+    (tmp_path / "recover.csv").write_text("name,address\nRecovered A,1 Restart Rd\n")
+
+    db.add_all([
+        JobStatus(
+            batch_id="recover-import",
+            total_hospitals=1,
+            status="IN_PROGRESS",
+            upload_ref="recover.csv",
+        ),
+        JobStatus(batch_id="recover-no-ref", total_hospitals=1, status="IN_PROGRESS"),
+        JobStatus(batch_id="recover-delete", total_hospitals=1, status="DELETING"),
+        JobStatus(
+            batch_id="recover-activate",
+            total_hospitals=1,
+            status="COMPLETED",
+            sys_custom_fields={
+                "batch_activated": True,
+                "activation": {"status": "IN_PROGRESS", "activated_hospitals": 0},
+            },
+        ),
+    ])
+    await db.commit()
+    db.add_all([
+        Hospital(name="Recover delete", address="1 Gone Rd", creation_batch_id="recover-delete"),
+        Hospital(name="Recover activate", address="1 On Rd", creation_batch_id="recover-activate"),
+    ])
+    await db.commit()
+
+    backend = InProcessBackend(
+        queue_size=10,
+        concurrency=2,
+        session_factory=async_sessionmaker(
+            test_engine, expire_on_commit=False, class_=AsyncSession
+        ),
+    )
+    await backend.recover()
+    await backend.join()
+    await backend.stop()
+
+    db.expire_all()
+    jobs_by_id = {
+        job.batch_id: job
+        for job in await db.scalars(
+            select(JobStatus).where(JobStatus.batch_id.like("recover-%"))
+        )
+    }
+    assert jobs_by_id["recover-import"].status == "COMPLETED"
+    assert jobs_by_id["recover-import"].processed_hospitals == 1
+    assert jobs_by_id["recover-no-ref"].status == "FAILED"
+    assert jobs_by_id["recover-no-ref"].sys_custom_fields["error"] == "Import interrupted"
+    assert "recover-delete" not in jobs_by_id
+    assert (
+        jobs_by_id["recover-activate"].sys_custom_fields["activation"]["status"]
+        == "COMPLETED"
+    )
+    assert await db.scalar(
+        select(Hospital.is_active).where(Hospital.creation_batch_id == "recover-activate")
+    )
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import metrics
+from tests.utils import get_client
+
+
+def test_record_task_observes_task_duration():
+    labels = {"task": "test_task", "state": "SUCCESS"}
+    before = metrics.REGISTRY.get_sample_value(
+        "hms_worker_task_duration_seconds_count", labels
+    ) or 0
+
+    metrics.record_task("test_task", "SUCCESS", 0.3)
+
+    assert metrics.REGISTRY.get_sample_value(
+        "hms_worker_task_duration_seconds_count", labels
+    ) == before + 1
+    assert metrics.REGISTRY.get_sample_value(
+        "hms_worker_task_duration_seconds_bucket", {**labels, "le": "0.5"}
+    ) == before + 1
+
+
+def test_render_collects_every_process_in_multiprocess_mode(tmp_path):
+    # Multiprocess mode is chosen when prometheus_client is imported, so
+    # each process here starts with PROMETHEUS_MULTIPROC_DIR set.
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    record = "from app import metrics; metrics.record_task('t', 'SUCCESS', 1)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", record], env=env, check=True)
+
+    output = subprocess.run(
+        [sys.executable, "-c", "from app import metrics; print(metrics.render().decode())"],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert (
+        'hms_worker_task_duration_seconds_count{state="SUCCESS",task="t"} 2.0'
+    ) in output
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates():
+    async with get_client() as ac:
+        await ac.get("/cache/stats")
+        r = await ac.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert (
+        'hms_http_request_duration_seconds_count'
+        '{method="GET",route="/cache/stats",status="200"}'
+    ) in r.text
+    assert "# TYPE hms_worker_task_duration_seconds histogram" in r.text
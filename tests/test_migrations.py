@@ -0,0 +1,68 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from app.utils import hospital_dedup_key
+
+
+VERSIONS = Path(__file__).resolve().parents[1] / "alembic" / "versions"
+
+NON_ASCII_HOSPITALS = [
+    ("Hôpital  GÉNÉRAL", "Rue de l'Église"),
+    ("東京病院", "東京都 千代田区"),
+    ("ΣΟΦΙΑ Clinic", "Οδός 5"),
+    ("İstanbul Üniversitesi", "Fatih, İstanbul"),
+    ("Straße-Klinik", "Hauptstraße 1"),
+    ("مستشفى ١٢٣", "شارع ٤"),
+]
+
+
+def load_migration(name):
+    pytest.importorskip("alembic.op")
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.asyncio
+async def test_rekey_matches_hospital_dedup_key_on_non_ascii_text(test_engine):
+    migration = load_migration("a4c9e1b7d3f5_rekey_hospital_dedup_in_python")
+
+    async with test_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            # Keyed as a locale-dependent SQL backfill may have left them,
+            # plus a duplicate of the first hospital without a key.
+            ids = []
+            for n, (name, address) in enumerate(NON_ASCII_HOSPITALS):
+                result = await conn.execute(
+                    text(
+                        "INSERT INTO hospitals (name, address, dedup_key) "
+                        "VALUES (:name, :address, :dedup_key) RETURNING id"
+                    ),
+                    {"name": name, "address": address, "dedup_key": f"stale-{n}"},
+                )
+                ids.append(result.scalar_one())
+            result = await conn.execute(
+                text(
+                    "INSERT INTO hospitals (name, address) "
+                    "VALUES ('hôpital général', 'RUE DE L''ÉGLISE') RETURNING id"
+                )
+            )
+            duplicate_id = result.scalar_one()
+
+            await conn.run_sync(migration.rekey)
+
+            keys = dict((await conn.execute(
+                text("SELECT id, dedup_key FROM hospitals WHERE id = ANY(:ids)"),
+                {"ids": ids + [duplicate_id]},
+            )).all())
+        finally:
+            await trans.rollback()
+
+    expected = {hospital_dedup_key(name, address) for name, address in NON_ASCII_HOSPITALS}
+    assert {keys[id_] for id_ in ids} == expected
+    assert keys[duplicate_id] is None
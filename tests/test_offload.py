@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import metrics
+from app.offload import Offloader
+from app.utils import validate_csv_file
+
+
+@pytest.mark.asyncio
+async def test_offloader_bounds_concurrency_and_reports_queue_depth():
+    offloader = Offloader("thread", workers=1)
+    release = threading.Event()
+
+    def blocking(n):
+        release.wait(5)
+        return n
+
+    try:
+        first = asyncio.create_task(offloader.run(blocking, 1))
+        second = asyncio.create_task(offloader.run(blocking, 2))
+        await asyncio.sleep(0.05)
+
+        assert metrics.REGISTRY.get_sample_value("hms_offload_in_flight") == 1
+        assert metrics.REGISTRY.get_sample_value("hms_offload_queue_depth") == 1
+
+        release.set()
+        assert await asyncio.gather(first, second) == [1, 2]
+        assert metrics.REGISTRY.get_sample_value("hms_offload_queue_depth") == 0
+        assert metrics.REGISTRY.get_sample_value("hms_offload_in_flight") == 0
+    finally:
+        release.set()
+        offloader.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_offloader_validates_in_a_process(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    path.write_text("name,address\nA,Addr A\nB,\n")
+    offloader = Offloader("process", workers=1)
+
+    try:
+        report = await offloader.run(validate_csv_file, str(path))
+    finally:
+        offloader.shutdown()
+
+    assert report.total_rows == 2
+    assert report.error_counts == {"missing_address": 1}
+
+
+def test_offloader_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        Offloader("fork", workers=1)
@@ -0,0 +1,287 @@
+import io
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+
+from app.batch_ops import activate_batch_hospitals, delete_batch_rows
+from app.utils import encode_cursor
+from models import Hospital, JobStatus, BatchRowError
+from tests.utils import get_client
+
+
+# Either index on hospitals.id serves id lookups.
+HOSPITAL_ID_INDEXES = ("hospitals_pkey", "ix_hospitals_id")
+
+# Method, path and the indexes its queries must use.
+ENDPOINTS = [
+    ("GET", "/hospitals?limit=5", [HOSPITAL_ID_INDEXES]),
+    ("GET", "/hospitals?cursor={cursor}", [HOSPITAL_ID_INDEXES]),
+    ("GET", "/hospitals/{hospital_id}", [HOSPITAL_ID_INDEXES]),
+    (
+        "GET",
+        "/hospitals/search?q=Plan",
+        ["ix_hospitals_name_trgm", "ix_hospitals_address_trgm"],
+    ),
+    ("GET", "/hospitals/batches?limit=5", ["ix_job_status_created_at_id"]),
+    # Selective only for a rare status; most batches are COMPLETED.
+    (
+        "GET",
+        "/hospitals/batches?status=FAILED",
+        ["ix_job_status_status_created_at"],
+    ),
+    (
+        "GET",
+        "/hospitals/batch/{batch_id}",
+        ["ix_job_status_batch_id", "ix_hospitals_creation_batch_id_id"],
+    ),
+    (
+        "GET",
+        "/hospitals/batch/{batch_id}/errors",
+        ["ix_job_status_batch_id", "ix_batch_row_errors_batch_id_row_number"],
+    ),
+    ("PATCH", "/hospitals/batch/{batch_id}/activate", ["ix_job_status_batch_id"]),
+    ("DELETE", "/hospitals/batch/{batch_id}", ["ix_job_status_batch_id"]),
+]
+
+# A Filter: on one of these means its index was bypassed, e.g. for a scan
+# of another index that only provides the ordering.
+INDEXED_COLUMNS = ("creation_batch_id", "batch_id", "content_sha256", "dedup_key")
+
+FILLER_BATCHES = 500
+FILLER_HOSPITALS = 20000
+FILLER_ROW_ERRORS = 20000
+
+
+async def analyze(engine):
+    """
+    Refreshes the planner statistics and, as autovacuum would, flushes the
+    GIN pending lists, which otherwise make the trigram indexes look
+    expensive.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("job_status", "hospitals", "batch_row_errors"):
+            await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+@pytest_asyncio.fixture
+async def filler(test_engine):
+    """
+    Unrelated batches, hospitals and row errors, so that as on a real
+    table the planner only picks a sequential scan, or an index that does
+    not match the lookup, when the right index is missing. Seeded once
+    per session.
+    """
+    async with test_engine.begin() as conn:
+        seeded = await conn.scalar(
+            text("SELECT 1 FROM job_status WHERE batch_id = 'plan-filler-1'")
+        )
+        if seeded is None:
+            await conn.execute(
+                text(
+                    "INSERT INTO job_status (batch_id, total_hospitals, "
+                    "status, content_sha256) "
+                    "SELECT 'plan-filler-' || b, 40, 'COMPLETED', "
+                    "md5('plan filler ' || b) "
+                    "FROM generate_series(1, :batches) AS b"
+                ),
+                {"batches": FILLER_BATCHES},
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO hospitals (name, address, creation_batch_id, "
+                    "is_active, dedup_key) "
+                    "SELECT 'Filler ' || md5('name ' || g), "
+                    "g || ' ' || md5('address ' || g), "
+                    "'plan-filler-' || (1 + g % :batches), false, "
+                    "md5('plan filler ' || g) "
+                    "FROM generate_series(1, :hospitals) AS g"
+                ),
+                {"batches": FILLER_BATCHES, "hospitals": FILLER_HOSPITALS},
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO batch_row_errors (batch_id, row_number, error) "
+                    "SELECT 'plan-filler-' || (1 + g % :batches), g, 'bad row' "
+                    "FROM generate_series(1, :errors) AS g"
+                ),
+                {"batches": FILLER_BATCHES, "errors": FILLER_ROW_ERRORS},
+            )
+
+    await analyze(test_engine)
+
+
+@pytest_asyncio.fixture
+async def seeded_batch(test_engine, override_get_db, filler):
+    db = override_get_db
+    batch_id = str(uuid4())
+
+    db.add(JobStatus(batch_id=batch_id, total_hospitals=20, status="COMPLETED"))
+    await db.commit()
+
+    hospitals = [
+        Hospital(
+            name=f"Plan {batch_id[:8]} {n}",
+            address=f"{n} Plan St",
+            creation_batch_id=batch_id,
+        )
+        for n in range(20)
+    ]
+    db.add_all(hospitals)
+    db.add_all([
+        BatchRowError(batch_id=batch_id, row_number=n, error="bad row")
+        for n in range(21, 25)
+    ])
+    await db.commit()
+    await analyze(test_engine)
+
+    return {
+        "batch_id": batch_id,
+        "hospital_id": hospitals[0].id,
+        "cursor": encode_cursor({"id": hospitals[0].id}),
+    }
+
+
+def capture_statements(engine):
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            return
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _capture)
+    return statements, lambda: event.remove(
+        engine.sync_engine, "before_cursor_execute", _capture
+    )
+
+
+async def assert_uses_indexes(engine, statements, indexes, label):
+    """
+    EXPLAINs the captured statements against the seeded tables: none may
+    scan a table sequentially or filter on an indexed column, and each of
+    `indexes` (a name, or a tuple of interchangeable names) must appear in
+    at least one plan.
+    """
+    assert statements, f"{label} issued no queries"
+    plans = []
+
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN {statement}", parameters
+            )
+            plan = "\n".join(row[0] for row in result)
+            plans.append(plan)
+
+            assert "Seq Scan" not in plan, (
+                f"{label} runs a sequential scan:\n{statement}\n{plan}"
+            )
+            for line in plan.splitlines():
+                if "Filter:" not in line:
+                    continue
+                assert not any(
+                    f"{column})" in line or f"{column} " in line
+                    for column in INDEXED_COLUMNS
+                ), f"{label} filters on an indexed column:\n{statement}\n{plan}"
+
+    explained = "\n".join(plans)
+    for index in indexes:
+        names = (index,) if isinstance(index, str) else index
+        assert any(name in explained for name in names), (
+            f"{label} does not use {' or '.join(names)}:\n{explained}"
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, path, indexes", ENDPOINTS)
+async def test_endpoint_queries_use_indexes(
+    test_engine, seeded_batch, monkeypatch, method, path, indexes
+):
+    for task in ("activate_batch_task", "delete_batch_task"):
+        monkeypatch.setattr(
+            f"worker.tasks.{task}.delay", lambda *args, **kwargs: None
+        )
+
+    url = path.format(**seeded_batch)
+    statements, stop = capture_statements(test_engine)
+
+    try:
+        async with get_client() as ac:
+            r = await ac.request(method, url)
+    finally:
+        stop()
+
+    assert r.status_code < 400
+    await assert_uses_indexes(
+        test_engine, statements, indexes, f"{method} {path}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_queries_use_indexes(
+    test_engine, override_get_db, filler, monkeypatch
+):
+    monkeypatch.setattr(
+        "worker.tasks.process_bulk_hospitals.delay",
+        lambda *args, **kwargs: None,
+    )
+    csv_content = f"name,address\nPlan {uuid4()},Addr\n".encode()
+    statements, stop = capture_statements(test_engine)
+
+    try:
+        async with get_client() as ac:
+            r = await ac.post(
+                "/hospitals/bulk",
+                files={"file": ("plan.csv", io.BytesIO(csv_content), "text/csv")},
+            )
+    finally:
+        stop()
+
+    assert r.status_code == 201
+    await assert_uses_indexes(
+        test_engine,
+        statements,
+        ["ix_job_status_content_sha256"],
+        "POST /hospitals/bulk",
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "operation, batch_id, indexes",
+    [
+        (
+            activate_batch_hospitals,
+            "plan-filler-2",
+            ["ix_hospitals_creation_batch_id_id", "ix_job_status_batch_id"],
+        ),
+        (
+            delete_batch_rows,
+            "plan-filler-3",
+            [
+                "ix_hospitals_creation_batch_id_id",
+                "ix_batch_row_errors_batch_id_row_number",
+            ],
+        ),
+    ],
+)
+async def test_background_batch_queries_use_indexes(
+    test_engine, override_get_db, filler, monkeypatch, operation, batch_id, indexes
+):
+    # A filler batch: its hospitals are spread over the whole id range,
+    # like a batch imported while others were.
+    monkeypatch.setattr("app.batch_ops.BATCH_OP_CHUNK_SIZE", 7)
+    statements, stop = capture_statements(test_engine)
+
+    try:
+        await operation(override_get_db, batch_id)
+    finally:
+        stop()
+
+    await assert_uses_indexes(
+        test_engine, statements, indexes, operation.__name__
+    )
@@ -0,0 +1,81 @@
+import io
+from datetime import datetime, timezone
+
+from app.serializers import HospitalResponse
+from app.utils import (
+    dumps_json,
+    validate_csv_stream,
+    encode_cursor,
+    decode_cursor,
+    escape_like,
+    hospital_dedup_key,
+)
+
+
+def test_validate_csv_stream_bounds_reported_errors():
+    rows = b"".join(b",Addr\n" for _ in range(50))
+    report = validate_csv_stream(
+        io.BytesIO(b"name,address\n" + rows + b"A,Addr A\n"),
+        max_errors=5,
+    )
+
+    assert report.total_rows == 51
+    assert len(report.errors) == 5
+    assert report.error_counts == {"missing_name": 50}
+    assert report.total_errors == 50
+    assert not report.is_valid
+
+
+def test_validate_csv_stream_valid_file():
+    report = validate_csv_stream(
+        io.BytesIO(b"name,address,phone\nA,Addr A,1\nB,Addr B,\n")
+    )
+
+    assert report.is_valid
+    assert report.total_rows == 2
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor({"id": 42})) == {"id": 42}
+
+
+def test_escape_like():
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+
+
+def test_hospital_dedup_key_folds_case_whitespace_and_punctuation():
+    assert hospital_dedup_key("St. Mary's  Hospital", "12, Oak Rd") == (
+        hospital_dedup_key("st mary s hospital", "12 oak rd")
+    )
+    assert hospital_dedup_key("A", "B") != hospital_dedup_key("A B", "")
+
+
+def test_hospital_dedup_key_keeps_non_ascii_text():
+    assert hospital_dedup_key("東京病院", "東京都") != (
+        hospital_dedup_key("大阪病院", "大阪府")
+    )
+    assert hospital_dedup_key("Hôpital  Général", "Rue X") == (
+        hospital_dedup_key("hôpital général", "rue x")
+    )
+    assert hospital_dedup_key("Hôpital", "Rue X") != (
+        hospital_dedup_key("Hapital", "Rue X")
+    )
+    # lower(), not casefold(): ß is kept as is.
+    assert hospital_dedup_key("Straße", "X") != hospital_dedup_key("Strasse", "X")
+
+
+def test_dumps_json_matches_pydantic_output():
+    hospital = {
+        "id": 1,
+        "name": "A",
+        "address": "Addr A",
+        "phone": None,
+        "creation_batch_id": None,
+        "is_active": True,
+        "created_at": datetime(2026, 1, 1, 8, 30, 0, 1234, tzinfo=timezone.utc),
+        "updated_at": None,
+    }
+
+    assert dumps_json(hospital) == (
+        HospitalResponse(**hospital).model_dump_json().encode()
+    )
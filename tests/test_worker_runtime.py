@@ -0,0 +1,80 @@
+import asyncio
+
+from worker import runtime
+
+
+def test_runtime_reuses_one_loop_and_engine():
+    async def _current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        first = runtime.run(_current_loop())
+        factory = runtime.session_factory
+        second = runtime.run(_current_loop())
+
+        assert first is second
+        assert runtime.session_factory is factory
+    finally:
+        runtime.shutdown_runtime()
+
+    assert runtime.session_factory is None
+
+
+def test_bulk_import_marks_batch_failed_when_retries_run_out(monkeypatch):
+    from worker import tasks
+
+    failed = []
+
+    async def _fail_import(db, batch_id, error):
+        failed.append((batch_id, error))
+
+    monkeypatch.setattr(tasks, "fail_import", _fail_import)
+
+    try:
+        tasks.process_bulk_hospitals.on_failure(
+            RuntimeError("boom"), "task-id", ("batch-1", "ref.csv"), {}, None
+        )
+    finally:
+        runtime.shutdown_runtime()
+
+    assert failed == [("batch-1", "Import failed")]
+
+
+def test_activation_marked_failed_when_retries_run_out(monkeypatch):
+    from worker import tasks
+
+    failed = []
+
+    async def _fail_batch_activation(db, batch_id, error):
+        failed.append((batch_id, error))
+
+    monkeypatch.setattr(tasks, "fail_batch_activation", _fail_batch_activation)
+
+    try:
+        tasks.activate_batch_task.on_failure(
+            RuntimeError("boom"), "task-id", ("batch-1",), {}, None
+        )
+    finally:
+        runtime.shutdown_runtime()
+
+    assert failed == [("batch-1", "Activation failed")]
+
+
+def test_deletion_marked_failed_when_retries_run_out(monkeypatch):
+    from worker import tasks
+
+    failed = []
+
+    async def _fail_batch_deletion(db, batch_id, error):
+        failed.append((batch_id, error))
+
+    monkeypatch.setattr(tasks, "fail_batch_deletion", _fail_batch_deletion)
+
+    try:
+        tasks.delete_batch_task.on_failure(
+            RuntimeError("boom"), "task-id", ("batch-1",), {}, None
+        )
+    finally:
+        runtime.shutdown_runtime()
+
+    assert failed == [("batch-1", "Deletion failed")]
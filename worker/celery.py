@@ -14,5 +14,13 @@ celery_app = Celery(
     backend=backend,
 )
 
+# Tasks resume from their checkpoints, so a task cut off by a restart or
+# deploy is acknowledged only once it finishes and is redelivered instead
+# of lost, leaving its batch IN_PROGRESS.
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+)
+
 
 celery_app.autodiscover_tasks(["worker"])
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from prometheus_client import start_http_server
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import metrics
+from app.cache import cache
+from app.events import broker
+from app.database import build_engine
+from app.const import WORKER_METRICS_PORT
+
+WORKER_DB_POOL_SIZE = int(os.getenv("WORKER_DB_POOL_SIZE", "2"))
+WORKER_DB_MAX_OVERFLOW = int(os.getenv("WORKER_DB_MAX_OVERFLOW", "2"))
+
+# One event loop and one pooled engine per worker process. Connections
+# and Redis clients are bound to the loop that opened them, so every task
+# in the process has to run on this same loop to reuse them.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine: Optional[AsyncEngine] = None
+session_factory: Optional[sessionmaker] = None
+# task_id -> perf_counter() at task start
+_task_started: Dict[str, float] = {}
+
+
+def init_runtime() -> None:
+    global _loop, _engine, session_factory
+
+    if _loop is not None:
+        return
+
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+    _engine = build_engine(
+        pool_size=WORKER_DB_POOL_SIZE,
+        max_overflow=WORKER_DB_MAX_OVERFLOW,
+    )
+    session_factory = sessionmaker(
+        bind=_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+def shutdown_runtime() -> None:
+    global _loop, _engine, session_factory
+
+    if _loop is None:
+        return
+
+    _loop.run_until_complete(cache.close())
+    _loop.run_until_complete(broker.close())
+    _loop.run_until_complete(_engine.dispose())
+    _loop.close()
+
+    _loop = None
+    _engine = None
+    session_factory = None
+
+
+def run(coro: Awaitable[Any]) -> Any:
+    """
+    Runs a coroutine to completion on the worker's persistent loop. The
+    runtime is created lazily for pools that never fire worker_process_init
+    (e.g. --pool=solo).
+    """
+    init_runtime()
+    return _loop.run_until_complete(coro)
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs) -> None:
+    init_runtime()
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(pid=None, **kwargs) -> None:
+    shutdown_runtime()
+    metrics.mark_process_dead(pid)
+
+
+@worker_init.connect
+def _on_worker_init(**kwargs) -> None:
+    # Task timings of a worker on another host than the API (e.g. Render)
+    # are scraped from the worker itself.
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT, registry=metrics.registry())
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, **kwargs) -> None:
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs) -> None:
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+
+    metrics.record_task(
+        task.name, state or "UNKNOWN", time.perf_counter() - started
+    )
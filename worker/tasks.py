@@ -1,82 +1,171 @@
-import csv
-import io
-import time
-import asyncio
+from celery import chord
+
+from worker import runtime
 from worker.celery import celery_app
-from app.database import async_session_factory
-from models import Hospital, JobStatus
-from sqlalchemy import select
+from app.batch_ops import (
+    activate_batch_hospitals,
+    delete_batch_rows,
+    fail_batch_activation,
+    fail_batch_deletion,
+)
+from app.ingestion import (
+    plan_import_chunks,
+    import_chunk,
+    finalize_import,
+    fail_import,
+)
+
+
+async def _fail_batch(batch_id: str, error: str) -> None:
+    async with runtime.session_factory() as db:
+        await fail_import(db, batch_id, error)
+
+
+class BulkImportTask(celery_app.Task):
+    """
+    Marks the batch FAILED once the import has run out of retries, so it
+    does not stay IN_PROGRESS forever (the chord path has its own error
+    callback, fail_bulk_import).
+    """
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        batch_id = kwargs.get("batch_id") or args[0]
+        runtime.run(_fail_batch(batch_id, "Import failed"))
 
 
 @celery_app.task(
     bind=True,
+    base=BulkImportTask,
     name="bulk_hospitals_task",
     autoretry_for=(Exception,),
     retry_kwargs={"max_retries": 3, "countdown": 5},
 )
-def process_bulk_hospitals(self, batch_id: str, csv_text: str) -> None:
+def process_bulk_hospitals(self, batch_id: str, upload_ref: str) -> None:
+
+    async def _plan():
+        async with runtime.session_factory() as db:
+            return await plan_import_chunks(db, batch_id, upload_ref)
+
+    ranges = runtime.run(_plan())
+    if not ranges:
+        return
+
+    if len(ranges) == 1:
+        # Not worth a round-trip through the broker.
+        start_row, end_row = ranges[0]
+        import_bulk_chunk(batch_id, upload_ref, start_row, end_row)
+        finalize_bulk_import(None, batch_id, upload_ref)
+        return
+
+    chord(
+        import_bulk_chunk.s(batch_id, upload_ref, start_row, end_row)
+        for start_row, end_row in ranges
+    )(
+        finalize_bulk_import.s(batch_id, upload_ref).on_error(
+            fail_bulk_import.s(batch_id=batch_id)
+        )
+    )
+
+
+@celery_app.task(
+    bind=True,
+    name="bulk_hospitals_chunk_task",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 5},
+)
+def import_bulk_chunk(
+    self, batch_id: str, upload_ref: str, start_row: int, end_row: int
+) -> None:
+
+    async def _run():
+        async with runtime.session_factory() as db:
+            await import_chunk(db, batch_id, upload_ref, start_row, end_row)
+
+    runtime.run(_run())
+
+
+@celery_app.task(
+    bind=True,
+    name="bulk_hospitals_finalize_task",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 5},
+)
+def finalize_bulk_import(self, results, batch_id: str, upload_ref: str) -> None:
+
+    async def _run():
+        async with runtime.session_factory() as db:
+            await finalize_import(db, batch_id, upload_ref)
+
+    runtime.run(_run())
+
+
+@celery_app.task(name="bulk_hospitals_fail_task")
+def fail_bulk_import(*args, batch_id: str) -> None:
+    """
+    Error callback of the import chord: a chunk ran out of retries.
+    """
+    runtime.run(_fail_batch(batch_id, "Import chunk failed"))
+
+
+async def _fail_activation(batch_id: str, error: str) -> None:
+    async with runtime.session_factory() as db:
+        await fail_batch_activation(db, batch_id, error)
+
+
+class ActivateBatchTask(celery_app.Task):
+    """
+    Marks the activation FAILED and clears batch_activated once it has
+    run out of retries, so the batch can be activated again.
+    """
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        batch_id = kwargs.get("batch_id") or args[0]
+        runtime.run(_fail_activation(batch_id, "Activation failed"))
+
+
+@celery_app.task(
+    bind=True,
+    base=ActivateBatchTask,
+    name="activate_batch_task",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 5},
+)
+def activate_batch_task(self, batch_id: str) -> None:
 
     async def _run():
-        start_time = time.time()
-
-        async with async_session_factory() as db:
-            result = await db.execute(
-                select(JobStatus).where(JobStatus.batch_id == batch_id)
-            )
-            job = result.scalar_one_or_none()
-            if not job:
-                return
-            
-            reader = csv.DictReader(io.StringIO(csv_text))
-            processed = 0
-            failed = 0
-            job.sys_custom_fields.setdefault("hospitals", {})
-
-            for idx, row in enumerate(reader, start=1):
-                error_info = None
-                name = row.get("name")
-                address = row.get("address")
-                hospital_key = name or f"row_{idx}"
-                try:
-                    if not name or not address:
-                        failed += 1
-                        job.sys_custom_fields["hospitals"][hospital_key] = {
-                            "error": (
-                                f"Missing required fields. "
-                                f"Name: {name}, Address: {address}"
-                            )
-                        }
-                        continue
-                    hospital = Hospital(
-                        name=name,
-                        address=address,
-                        phone=row.get("phone"),
-                        creation_batch_id=batch_id,
-                        is_active=False,
-                    )
-                    db.add(hospital)
-                    await db.flush()
-                    processed += 1
-
-                except Exception as err:
-                    failed += 1
-                    error_info = str(err)
-
-                if error_info:
-                    job.sys_custom_fields["hospitals"][hospital_key] = {
-                        "error": error_info
-                    }
-
-                job.processed_hospitals = processed
-                job.failed_hospitals = failed
-
-            job.status = (
-                "COMPLETED" if failed == 0 else "COMPLETED_WITH_ERRORS"
-            )
-            job.processing_time_seconds = round(
-                time.time() - start_time, 2
-            )
-
-            await db.commit()
-
-    asyncio.run(_run())
\ No newline at end of file
+        async with runtime.session_factory() as db:
+            await activate_batch_hospitals(db, batch_id)
+
+    runtime.run(_run())
+
+
+async def _fail_deletion(batch_id: str, error: str) -> None:
+    async with runtime.session_factory() as db:
+        await fail_batch_deletion(db, batch_id, error)
+
+
+class DeleteBatchTask(celery_app.Task):
+    """
+    Marks the deletion FAILED once it has run out of retries; the batch
+    stays DELETING and a repeat DELETE resumes it.
+    """
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        batch_id = kwargs.get("batch_id") or args[0]
+        runtime.run(_fail_deletion(batch_id, "Deletion failed"))
+
+
+@celery_app.task(
+    bind=True,
+    base=DeleteBatchTask,
+    name="delete_batch_task",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 5},
+)
+def delete_batch_task(self, batch_id: str) -> None:
+
+    async def _run():
+        async with runtime.session_factory() as db:
+            await delete_batch_rows(db, batch_id)
+
+    runtime.run(_run())